@@ -0,0 +1,35 @@
+"""tasks filter and sort indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_tasks_owner_id_is_completed_id', 'tasks', ['owner_id', 'is_completed', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_tasks_owner_id_title_id', 'tasks', ['owner_id', sa.text('title COLLATE "C"'), 'id'], unique=False
+    )
+    # заменен индексом ix_tasks_owner_id_title_id
+    op.drop_index('ix_tasks_title', table_name='tasks')
+
+
+def downgrade() -> None:
+    op.create_index('ix_tasks_title', 'tasks', ['title'], unique=False)
+    op.drop_index('ix_tasks_owner_id_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_is_completed_id', table_name='tasks')
@@ -0,0 +1,99 @@
+"""task stats counters
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Счетчики обновляются триггерами уровня оператора с таблицами переходов:
+# один upsert на оператор (в том числе на пакетные запросы и COPY), а не на строку.
+# Изменения, не затрагивающие количество задач и их статус, счетчики не блокируют.
+TASK_STATS_FUNCTION = """
+CREATE FUNCTION task_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, count(*), count(*) FILTER (WHERE is_completed)
+        FROM new_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed)
+        FROM old_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    ELSE
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, sum(total), sum(completed)
+        FROM (
+            SELECT owner_id, count(*) AS total, count(*) FILTER (WHERE is_completed) AS completed
+            FROM new_rows GROUP BY owner_id
+            UNION ALL
+            SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed)
+            FROM old_rows GROUP BY owner_id
+        ) AS delta
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id
+        HAVING sum(total) <> 0 OR sum(completed) <> 0
+        ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_stats',
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('completed', sa.BigInteger(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('owner_id')
+    )
+    op.execute(TASK_STATS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER task_stats_update AFTER UPDATE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    # начальное заполнение счетчиков
+    op.execute(
+        "INSERT INTO task_stats (owner_id, total, completed) "
+        "SELECT users.id, count(tasks.id), count(tasks.id) FILTER (WHERE tasks.is_completed) "
+        "FROM users LEFT JOIN tasks ON tasks.owner_id = users.id GROUP BY users.id"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER task_stats_delete ON tasks")
+    op.execute("DROP TRIGGER task_stats_update ON tasks")
+    op.execute("DROP TRIGGER task_stats_insert ON tasks")
+    op.execute("DROP FUNCTION task_stats_apply()")
+    op.drop_table('task_stats')
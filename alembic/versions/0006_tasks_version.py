@@ -0,0 +1,139 @@
+"""tasks row version and per-user version
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Версия строки задачи обновляется при каждом фактическом изменении строки
+TASK_VERSION_FUNCTION = """
+CREATE FUNCTION tasks_bump_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := nextval('tasks_version_seq');
+    RETURN NEW;
+END
+$$
+"""
+
+# Счетчики task_stats (миграция 0005) дополнительно получают версию списка задач пользователя:
+# она меняется при любом изменении его задач, в том числе при удалении
+TASK_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION task_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed, version)
+        SELECT owner_id, count(*), count(*) FILTER (WHERE is_completed), nextval('tasks_version_seq')
+        FROM new_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed,
+            version = EXCLUDED.version;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed, version)
+        SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed), nextval('tasks_version_seq')
+        FROM old_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed,
+            version = EXCLUDED.version;
+    ELSE
+        INSERT INTO task_stats AS s (owner_id, total, completed, version)
+        SELECT owner_id, sum(total), sum(completed), nextval('tasks_version_seq')
+        FROM (
+            SELECT owner_id, count(*) AS total, count(*) FILTER (WHERE is_completed) AS completed
+            FROM new_rows GROUP BY owner_id
+            UNION ALL
+            SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed)
+            FROM old_rows GROUP BY owner_id
+        ) AS delta
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id
+        ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed,
+            version = EXCLUDED.version;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Функция task_stats_apply из миграции 0005 (для отката)
+TASK_STATS_FUNCTION_0005 = """
+CREATE OR REPLACE FUNCTION task_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, count(*), count(*) FILTER (WHERE is_completed)
+        FROM new_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed)
+        FROM old_rows WHERE owner_id IS NOT NULL
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    ELSE
+        INSERT INTO task_stats AS s (owner_id, total, completed)
+        SELECT owner_id, sum(total), sum(completed)
+        FROM (
+            SELECT owner_id, count(*) AS total, count(*) FILTER (WHERE is_completed) AS completed
+            FROM new_rows GROUP BY owner_id
+            UNION ALL
+            SELECT owner_id, -count(*), -count(*) FILTER (WHERE is_completed)
+            FROM old_rows GROUP BY owner_id
+        ) AS delta
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id
+        HAVING sum(total) <> 0 OR sum(completed) <> 0
+        ORDER BY owner_id
+        ON CONFLICT (owner_id) DO UPDATE
+        SET total = s.total + EXCLUDED.total, completed = s.completed + EXCLUDED.completed;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE tasks_version_seq")
+    # Столбец с изменчивым значением по умолчанию заполняется для всех строк (таблица переписывается)
+    op.add_column(
+        'tasks',
+        sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('tasks_version_seq')"), nullable=False)
+    )
+    op.add_column('task_stats', sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+    op.execute("UPDATE task_stats SET version = nextval('tasks_version_seq')")
+    
+    op.execute(TASK_VERSION_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tasks_version BEFORE UPDATE ON tasks "
+        "FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION tasks_bump_version()"
+    )
+    op.execute(TASK_STATS_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(TASK_STATS_FUNCTION_0005)
+    op.execute("DROP TRIGGER tasks_version ON tasks")
+    op.execute("DROP FUNCTION tasks_bump_version()")
+    op.drop_column('task_stats', 'version')
+    op.drop_column('tasks', 'version')
+    op.execute("DROP SEQUENCE tasks_version_seq")
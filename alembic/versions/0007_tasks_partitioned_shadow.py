@@ -0,0 +1,123 @@
+"""hash-partitioned shadow tasks table
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Переход на секционированную таблицу без простоя выполняется в три шага:
+#   1. эта миграция создает пустую таблицу tasks_partitioned, секционированную хэшем owner_id,
+#      и триггеры, повторяющие в ней каждое изменение tasks;
+#   2. python -m app.jobs.backfill_task_partitions копирует существующие задачи пачками;
+#   3. миграция 0008 меняет таблицы местами.
+# Количество секций должно совпадать с app.models.Task.TASKS_PARTITIONS
+TASKS_PARTITIONS = 16
+
+TASKS_PARTITIONED_TABLE = """
+CREATE TABLE tasks_partitioned (
+    id integer NOT NULL DEFAULT nextval('tasks_id_seq'),
+    title varchar NOT NULL,
+    description varchar,
+    is_completed boolean,
+    owner_id integer NOT NULL,
+    version bigint NOT NULL DEFAULT nextval('tasks_version_seq'),
+    search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', title || ' ' || coalesce(description, ''))
+    ) STORED,
+    CONSTRAINT tasks_partitioned_pkey PRIMARY KEY (owner_id, id),
+    CONSTRAINT tasks_partitioned_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES users (id)
+) PARTITION BY HASH (owner_id)
+"""
+
+# Изменения tasks повторяются в tasks_partitioned триггерами уровня оператора с таблицами
+# переходов (как task_stats_apply): один запрос на оператор, в том числе на пакетные запросы и COPY.
+# Задачи без владельца не переносятся: ключ секционирования обязателен.
+TASKS_MIRROR_FUNCTION = """
+CREATE FUNCTION tasks_partitioned_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM tasks_partitioned AS p
+        USING old_rows AS o
+        WHERE p.owner_id = o.owner_id AND p.id = o.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO tasks_partitioned (id, title, description, is_completed, owner_id, version)
+        SELECT id, title, description, is_completed, owner_id, version
+        FROM new_rows WHERE owner_id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(TASKS_PARTITIONED_TABLE)
+    for remainder in range(TASKS_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE tasks_p{remainder:02d} PARTITION OF tasks_partitioned "
+            f"FOR VALUES WITH (MODULUS {TASKS_PARTITIONS}, REMAINDER {remainder})"
+        )
+    # индексы секционированной таблицы создаются в каждой секции;
+    # таблица пуста, поэтому создание не блокирует tasks
+    op.create_index(
+        'ix_tasks_partitioned_search_vector', 'tasks_partitioned', ['search_vector'],
+        unique=False, postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_tasks_partitioned_owner_id_is_completed_id', 'tasks_partitioned',
+        ['owner_id', 'is_completed', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_tasks_partitioned_owner_id_title_id', 'tasks_partitioned',
+        ['owner_id', sa.text('title COLLATE "C"'), 'id'], unique=False
+    )
+    
+    # состояние переноса существующих задач (app.jobs.backfill_task_partitions)
+    op.create_table(
+        'tasks_partition_backfill',
+        sa.Column('id', sa.Integer(), server_default=sa.text('1'), nullable=False),
+        sa.Column('last_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint('id = 1', name='tasks_partition_backfill_single_row'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO tasks_partition_backfill (id) VALUES (1)")
+    
+    op.execute(TASKS_MIRROR_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_insert AFTER INSERT ON tasks "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_update AFTER UPDATE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_delete AFTER DELETE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_delete ON tasks")
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_update ON tasks")
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_insert ON tasks")
+    op.execute("DROP FUNCTION tasks_partitioned_mirror()")
+    op.drop_table('tasks_partition_backfill')
+    # секции удаляются вместе с секционированной таблицей
+    op.drop_table('tasks_partitioned')
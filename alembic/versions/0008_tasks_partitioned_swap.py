@@ -0,0 +1,197 @@
+"""swap tasks with hash-partitioned table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Максимальное количество задач, которые миграция копирует сама, если перенос не завершен
+INLINE_BACKFILL_LIMIT = 10000
+
+# Индексы tasks_partitioned (миграция 0007) и их имена после замены таблицы
+PARTITIONED_INDEXES = {
+    'ix_tasks_partitioned_search_vector': 'ix_tasks_search_vector',
+    'ix_tasks_partitioned_owner_id_is_completed_id': 'ix_tasks_owner_id_is_completed_id',
+    'ix_tasks_partitioned_owner_id_title_id': 'ix_tasks_owner_id_title_id',
+}
+
+# Несекционированная таблица tasks (миграции 0001-0006, для отката)
+TASKS_TABLE = """
+CREATE TABLE tasks (
+    id integer NOT NULL DEFAULT nextval('tasks_id_seq'),
+    title varchar NOT NULL,
+    description varchar,
+    is_completed boolean,
+    owner_id integer,
+    version bigint NOT NULL DEFAULT nextval('tasks_version_seq'),
+    search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', title || ' ' || coalesce(description, ''))
+    ) STORED,
+    CONSTRAINT tasks_pkey PRIMARY KEY (id),
+    CONSTRAINT tasks_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES users (id)
+)
+"""
+
+# Функция tasks_partitioned_mirror из миграции 0007 (для отката)
+TASKS_MIRROR_FUNCTION_0007 = """
+CREATE FUNCTION tasks_partitioned_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM tasks_partitioned AS p
+        USING old_rows AS o
+        WHERE p.owner_id = o.owner_id AND p.id = o.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO tasks_partitioned (id, title, description, is_completed, owner_id, version)
+        SELECT id, title, description, is_completed, owner_id, version
+        FROM new_rows WHERE owner_id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def create_task_triggers() -> None:
+    # PostgreSQL 13+ поддерживает на секционированной таблице и триггеры уровня оператора
+    # с таблицами переходов, и BEFORE-триггеры уровня строки
+    op.execute(
+        "CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER task_stats_update AFTER UPDATE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_version BEFORE UPDATE ON tasks "
+        "FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION tasks_bump_version()"
+    )
+
+
+def drop_task_triggers() -> None:
+    op.execute("DROP TRIGGER tasks_version ON tasks")
+    op.execute("DROP TRIGGER task_stats_delete ON tasks")
+    op.execute("DROP TRIGGER task_stats_update ON tasks")
+    op.execute("DROP TRIGGER task_stats_insert ON tasks")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # После переноса tasks_partitioned совпадает с tasks (изменения повторяются триггерами),
+    # поэтому замена таблиц под блокировкой не копирует данные
+    op.execute("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE")
+    state = conn.execute(sa.text("SELECT last_id, completed_at FROM tasks_partition_backfill")).one()
+    if state.completed_at is None:
+        # небольшой остаток (например, новая или тестовая база при alembic upgrade head)
+        # копируется здесь, большой - только заданием переноса без блокировки
+        remaining = conn.execute(
+            sa.text("SELECT count(*) FROM (SELECT 1 FROM tasks WHERE id > :last_id LIMIT :limit) AS t"),
+            {"last_id": state.last_id, "limit": INLINE_BACKFILL_LIMIT + 1}
+        ).scalar()
+        if remaining > INLINE_BACKFILL_LIMIT:
+            raise RuntimeError(
+                "Tasks are not copied to tasks_partitioned yet: run python -m app.jobs.backfill_task_partitions"
+            )
+        op.execute(sa.text(
+            "INSERT INTO tasks_partitioned (id, title, description, is_completed, owner_id, version) "
+            "SELECT id, title, description, is_completed, owner_id, version FROM tasks "
+            "WHERE id > :last_id AND owner_id IS NOT NULL "
+            "ON CONFLICT (owner_id, id) DO NOTHING"
+        ).bindparams(last_id=state.last_id))
+    # поиск выполняется по индексу ix_tasks_owner_id_id
+    if conn.execute(sa.text("SELECT EXISTS (SELECT 1 FROM tasks WHERE owner_id IS NULL)")).scalar():
+        raise RuntimeError("Tasks without owner_id cannot be moved to partitions: delete them before upgrading")
+    
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_delete ON tasks")
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_update ON tasks")
+    op.execute("DROP TRIGGER tasks_partitioned_mirror_insert ON tasks")
+    op.execute("DROP FUNCTION tasks_partitioned_mirror()")
+    drop_task_triggers()
+    
+    # последовательность ID удалилась бы вместе со старой таблицей
+    op.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks_partitioned.id")
+    op.drop_table('tasks')
+    op.rename_table('tasks_partitioned', 'tasks')
+    op.execute("ALTER TABLE tasks RENAME CONSTRAINT tasks_partitioned_pkey TO tasks_pkey")
+    op.execute("ALTER TABLE tasks RENAME CONSTRAINT tasks_partitioned_owner_id_fkey TO tasks_owner_id_fkey")
+    for name, new_name in PARTITIONED_INDEXES.items():
+        op.execute(f"ALTER INDEX {name} RENAME TO {new_name}")
+    create_task_triggers()
+    
+    op.drop_table('tasks_partition_backfill')
+
+
+def downgrade() -> None:
+    # Откат копирует задачи в несекционированную таблицу под блокировкой (с простоем)
+    # и возвращает состояние миграции 0007 с завершенным переносом
+    op.execute("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE")
+    drop_task_triggers()
+    op.rename_table('tasks', 'tasks_partitioned')
+    op.execute("ALTER TABLE tasks_partitioned RENAME CONSTRAINT tasks_pkey TO tasks_partitioned_pkey")
+    op.execute(
+        "ALTER TABLE tasks_partitioned RENAME CONSTRAINT tasks_owner_id_fkey TO tasks_partitioned_owner_id_fkey"
+    )
+    for name, new_name in PARTITIONED_INDEXES.items():
+        op.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+    
+    op.execute(TASKS_TABLE)
+    op.execute(
+        "INSERT INTO tasks (id, title, description, is_completed, owner_id, version) "
+        "SELECT id, title, description, is_completed, owner_id, version FROM tasks_partitioned"
+    )
+    op.execute("ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id")
+    op.create_index('ix_tasks_id', 'tasks', ['id'], unique=False)
+    op.create_index('ix_tasks_owner_id_id', 'tasks', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_tasks_owner_id_is_completed_id', 'tasks', ['owner_id', 'is_completed', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_tasks_owner_id_title_id', 'tasks', ['owner_id', sa.text('title COLLATE "C"'), 'id'], unique=False
+    )
+    create_task_triggers()
+    
+    op.create_table(
+        'tasks_partition_backfill',
+        sa.Column('id', sa.Integer(), server_default=sa.text('1'), nullable=False),
+        sa.Column('last_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint('id = 1', name='tasks_partition_backfill_single_row'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO tasks_partition_backfill (id, last_id, completed_at) "
+        "SELECT 1, coalesce(max(id), 0), now() FROM tasks"
+    )
+    op.execute(TASKS_MIRROR_FUNCTION_0007)
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_insert AFTER INSERT ON tasks "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_update AFTER UPDATE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_partitioned_mirror_delete AFTER DELETE ON tasks "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION tasks_partitioned_mirror()"
+    )
@@ -0,0 +1,132 @@
+"""
+Ключи кэша FastAPICache, привязанные к пользователю, и их инвалидация
+"""
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi_cache import FastAPICache
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.cache import TwoTierBackend
+from app.depends import get_redis_client
+
+# Типы аргументов эндпоинта, которые участвуют в ключе кэша
+# (зависимости вроде сессии SQLAlchemy и сервисов пропускаются)
+KEY_ARG_TYPES = (int, float, str, bool, type(None))
+
+
+def generation_key(user_id: int) -> str:
+    """
+    Ключ Redis со счетчиком поколения кэша пользователя
+    :param user_id: ID пользователя
+    :return:
+    """
+    return f"fastapi-cache:generation:{user_id}"
+
+
+async def get_user_cache_generation(user_id: int) -> int:
+    """
+    Получение текущего поколения кэша пользователя.
+    Если используется TwoTierBackend, поколение берется из локального кэша воркера.
+    Прочитанное из Redis поколение не сохраняется локально, если во время чтения
+    пришла инвалидация (иначе воркер до local_ttl использовал бы старое поколение).
+    :param user_id: ID пользователя
+    :return:
+    """
+    key = generation_key(user_id)
+    backend = FastAPICache.get_backend()
+    epoch = None
+    if isinstance(backend, TwoTierBackend):
+        local = backend.get_local(key)
+        if local is not None:
+            return int(local[1])
+        epoch = backend.invalidation_epoch
+    
+    redis_client = await get_redis_client()
+    generation = await redis_client.get(key)
+    generation = int(generation) if generation is not None else 0
+    if isinstance(backend, TwoTierBackend):
+        backend.set_local(key, str(generation).encode(), epoch=epoch)
+    return generation
+
+
+async def invalidate_user_cache(user_id: int) -> None:
+    """
+    Инвалидация всех закэшированных ответов пользователя за O(1):
+    увеличение счетчика поколения делает все ранее построенные ключи недостижимыми,
+    старые записи удаляются из Redis по истечении TTL.
+    :param user_id: ID пользователя
+    :return:
+    """
+    key = generation_key(user_id)
+    backend = FastAPICache.get_backend()
+    if isinstance(backend, TwoTierBackend):
+        # увеличение поколения и публикация инвалидации - один round trip
+        await backend.invalidate(key, ("INCR", key))
+        return
+    
+    redis_client = await get_redis_client()
+    await redis_client.incr(key)
+
+
+async def user_key_builder(
+        func: Callable[..., Any],
+        namespace: str = "",
+        *,
+        request: Optional[Request] = None,
+        response: Optional[Response] = None,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+) -> str:
+    """
+    Построение ключа кэша по ID пользователя из JWT (аргумент user_id эндпоинта),
+    поколению его кэша, версии данных и параметрам запроса.
+    
+    Версию данных (task_stats.version или версию задачи) зависимости ETag читают
+    в той же сессии, что и эндпоинт (см. app.api.etag). Поколение увеличивается
+    на primary, а другой клиент пользователя может еще читать с отстающей реплики:
+    ответ, построенный по реплике, сохраняется под ключом ее (старой) версии и не
+    отдается клиентам, которые уже видят новую версию.
+    :param func: кэшируемый эндпоинт
+    :param namespace: пространство имен кэша
+    :param request: HTTP-запрос
+    :param response: HTTP-ответ
+    :param args: позиционные аргументы эндпоинта
+    :param kwargs: именованные аргументы эндпоинта
+    :return: ключ кэша
+    """
+    user_id = kwargs["user_id"]
+    generation = await get_user_cache_generation(user_id)
+    version = getattr(request.state, "data_version", None) if request is not None else None
+    params = sorted(
+        (key, value) for key, value in kwargs.items()
+        if key != "user_id" and isinstance(value, KEY_ARG_TYPES)
+    )
+    params_hash = hashlib.md5(f"{params}".encode()).hexdigest()
+    return f"{namespace}:user:{user_id}:{generation}:{version}:{func.__module__}.{func.__name__}:{params_hash}"
+
+
+def keep_cache_headers(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Декоратор эндпоинта поверх @cache, который возвращает готовый Response (например,
+    RawJSONResponse). FastAPICache (как и зависимости) выставляет заголовки
+    (X-FastAPI-Cache, Cache-Control, cookie) во временный ответ FastAPI уже после
+    вызова эндпоинта, а FastAPI отбрасывает их, если эндпоинт вернул Response сам.
+    Заголовки временного ответа добавляются к возвращенному ответу.
+    :param func: эндпоинт, обернутый @cache
+    :return:
+    """
+    
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        result = await func(*args, **kwargs)
+        if isinstance(result, Response):
+            for value in kwargs.values():
+                # временный ответ, который @cache добавляет в параметры эндпоинта
+                if isinstance(value, Response) and value is not result:
+                    result.raw_headers.extend(value.raw_headers)
+        return result
+    
+    return wrapper
@@ -0,0 +1,128 @@
+"""
+Условные GET-запросы: строгие ETag задач и списков задач пользователя, ответ 304 Not Modified
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.core.security import get_current_user_id
+from app.db.database import get_read_db
+from app.depends import get_task_service, get_task_stats_service
+from app.services import TaskService, TaskStatsService
+
+# Ответ с ETag может храниться только у клиента и перед использованием проверяется на сервере
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Строгий ETag по версии ресурса и параметрам запроса
+    :param parts: составляющие (тип ресурса, ID пользователя, версия, ...)
+    :return:
+    """
+    digest = hashlib.blake2b(":".join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверка заголовка If-None-Match (слабое сравнение, как требуется для GET)
+    :param if_none_match: значение заголовка
+    :param etag: текущий ETag ресурса
+    :return:
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def check_etag(request: Request, etag: str) -> None:
+    """
+    Ответ 304 Not Modified, если клиент прислал текущий ETag: эндпоинт
+    (запрос к БД, кэш и сериализация) при этом не выполняется.
+    Иначе ETag сохраняется для ответа (см. ETagMiddleware).
+    :param request: HTTP-запрос
+    :param etag: текущий ETag ресурса
+    :return:
+    """
+    request.state.etag = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+async def task_list_etag(
+        request: Request,
+        db: AsyncSession = Depends(get_read_db),
+        task_stats_service: TaskStatsService = Depends(get_task_stats_service),
+        user_id: int = Depends(get_current_user_id)
+) -> None:
+    """
+    Зависимость эндпоинтов списков задач пользователя: ETag по версии списка
+    (task_stats.version, одно чтение по первичному ключу), пути и параметрам запроса.
+    Версия читается в той же сессии (реплике), что и эндпоинт, и входит в ключ кэша
+    (см. app.api.cache.user_key_builder).
+    :param request: HTTP-запрос
+    :param db: сессия SQLAlchemy
+    :param task_stats_service: сервис счетчиков задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    version = await task_stats_service.get_version(db, user_id)
+    request.state.data_version = version
+    check_etag(request, make_etag("tasks", user_id, version, request.url.path, request.url.query))
+
+
+async def task_etag(
+        task_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_read_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+) -> None:
+    """
+    Зависимость эндпоинта задачи: ETag по версии строки задачи (версия входит и в ключ кэша).
+    Для несуществующей задачи ETag не вычисляется (эндпоинт вернет 404).
+    :param task_id: ID задачи
+    :param request: HTTP-запрос
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    version = await task_service.get_task_version(db, task_id, user_id)
+    request.state.data_version = version
+    if version is not None:
+        check_etag(request, make_etag("task", user_id, task_id, version))
+
+
+class ETagMiddleware:
+    """
+    ASGI middleware, которое выставляет ответу ETag, вычисленный зависимостями
+    task_list_etag / task_etag, вместо слабого ETag FastAPICache (хэш содержимого,
+    который различается между процессами)
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                etag = scope.get("state", {}).get("etag")
+                if etag is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = CACHE_CONTROL
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
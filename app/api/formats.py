@@ -0,0 +1,243 @@
+"""
+Форматы ответов и построчные форматы выгрузки и загрузки задач: JSON, NDJSON и CSV
+"""
+import codecs
+import csv
+import io
+import json
+from typing import Iterable, AsyncIterator, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import orjson
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Row
+
+from app.schemas import TaskOut
+
+# Поля задачи в выгрузке (и порядок колонок CSV)
+TASK_FIELDS = ("id", "title", "description", "is_completed", "owner_id")
+
+# Поля задачи в ответах API (в порядке полей схемы TaskOut)
+TASK_OUT_FIELDS = tuple(TaskOut.model_fields)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "sse": "text/event-stream",
+}
+
+
+class RawJSONResponse(JSONResponse):
+    """
+    JSON-ответ с уже закодированным телом (без повторной сериализации).
+    FastAPICache кэширует тело JSONResponse как есть.
+    """
+    
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Кодирование в JSON (orjson)
+    :param value: значение
+    :return:
+    """
+    return orjson.dumps(value)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Декодирование JSON (orjson)
+    :param data: JSON
+    :return:
+    """
+    return orjson.loads(data)
+
+
+def encode_task_page(rows: Iterable[Row], next_cursor: Optional[str]) -> bytes:
+    """
+    Кодирование страницы задач (схема TaskPage) из строк с полями TASK_OUT_FIELDS
+    без создания ORM-объектов и моделей pydantic
+    :param rows: строки задач
+    :param next_cursor: курсор следующей страницы
+    :return:
+    """
+    return dumps({"items": [dict(zip(TASK_OUT_FIELDS, row)) for row in rows], "next_cursor": next_cursor})
+
+
+def encode_ndjson(rows: Iterable[Row]) -> str:
+    """
+    Кодирование строк задач в NDJSON (по объекту JSON на строку)
+    :param rows: строки задач
+    :return:
+    """
+    return "".join(
+        json.dumps({field: row._mapping[field] for field in TASK_FIELDS}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def encode_sse(event_id: Optional[str], event: Optional[str], data: Optional[str]) -> str:
+    """
+    Кодирование события Server-Sent Events
+    :param event_id: ID события (None - комментарий для поддержания соединения)
+    :param event: тип события
+    :param data: данные события (JSON в одну строку)
+    :return:
+    """
+    if event_id is None:
+        return ": ping\n\n"
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def encode_csv(rows: Iterable[Row], header: bool = False) -> str:
+    """
+    Кодирование строк задач в CSV
+    :param rows: строки задач
+    :param header: добавить строку заголовка
+    :return:
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(TASK_FIELDS)
+    writer.writerows(tuple(row._mapping[field] for field in TASK_FIELDS) for row in rows)
+    return buffer.getvalue()
+
+
+class RecordSplitter:
+    """
+    Инкрементальное разбиение потока байтов на записи с номерами строк.
+    Пустые строки пропускаются. Для CSV запись продолжается на следующей строке,
+    пока в ней нечетное количество кавычек (перевод строки внутри поля).
+    Запись длиннее max_length символов не накапливается в памяти: она отбрасывается
+    до своего конца и возвращается как ошибка.
+    """
+    
+    def __init__(self, quoted: bool = False, max_length: Optional[int] = None):
+        self.quoted = quoted
+        self.max_length = max_length
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.pending = ""
+        self.record: Optional[str] = None
+        self.record_line = 0
+        self.open_quote = False
+        self.line_no = 0
+        # текущая запись отбрасывается; кавычки отброшенного начала строки
+        self.dropped = False
+        self.dropped_quotes = 0
+    
+    def feed(self, data: bytes, final: bool = False) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Обработка очередного фрагмента потока
+        :param data: фрагмент потока
+        :param final: признак последнего фрагмента
+        :return: завершенные записи (номер первой строки, запись, ошибка)
+        """
+        lines = (self.pending + self.decoder.decode(data, final)).split("\n")
+        self.pending = "" if final else lines.pop()
+        
+        records = []
+        for line in lines:
+            self.line_no += 1
+            line = line.rstrip("\r")
+            quotes = line.count('"') + self.dropped_quotes
+            self.dropped_quotes = 0
+            if not self.dropped:
+                if self.record is None:
+                    if not line.strip():
+                        continue
+                    self.record, self.record_line = line, self.line_no
+                else:
+                    self.record += "\n" + line
+                if self._too_long(len(self.record)):
+                    self._drop()
+            if self.quoted and quotes % 2:
+                self.open_quote = not self.open_quote
+            if not self.open_quote:
+                records.append(self._complete())
+        
+        # начало слишком длинной строки отбрасывается, не дожидаясь ее конца
+        if self._too_long(len(self.pending) + (len(self.record) if self.record is not None else 0)):
+            if self.record is None and not self.dropped:
+                self.record_line = self.line_no + 1
+            self._drop()
+            self.dropped_quotes += self.pending.count('"')
+            self.pending = ""
+        
+        if final and (self.record is not None or self.dropped):
+            records.append(self._complete())
+        return records
+    
+    def _too_long(self, length: int) -> bool:
+        return self.max_length is not None and length > self.max_length
+    
+    def _drop(self) -> None:
+        self.record = None
+        self.dropped = True
+    
+    def _complete(self) -> Tuple[int, Optional[str], Optional[str]]:
+        if self.dropped:
+            self.dropped = False
+            return self.record_line, None, f"Record is longer than {self.max_length} characters"
+        record, self.record = self.record, None
+        return self.record_line, record, None
+
+
+def decode_csv(record: str, header: Sequence[str]) -> Dict[str, Any]:
+    """
+    Декодирование записи CSV, пустые значения считаются null
+    :param record: запись CSV
+    :param header: названия колонок
+    :return:
+    """
+    values = next(csv.reader([record]), [])
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+    return {name: value if value != "" else None for name, value in zip(header, values)}
+
+
+async def decode_records(
+        chunks: AsyncIterator[bytes],
+        format: str,
+        max_length: Optional[int] = None
+) -> AsyncIterator[List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]]:
+    """
+    Потоковое разбиение задач в NDJSON (по объекту JSON на строку) или CSV
+    (первая запись - заголовок) на записи. Каждая запись разбирается отдельно
+    и возвращается словарем. Ошибка разбора записи (в том числе слишком длинная
+    запись) не прерывает загрузку, а возвращается вместе с номером строки.
+    :param chunks: поток байтов (например, тело HTTP-запроса)
+    :param format: ndjson или csv
+    :param max_length: максимальная длина записи, символов
+    :return: асинхронный итератор пачек (номер строки, данные, ошибка)
+    """
+    splitter = RecordSplitter(quoted=format == "csv", max_length=max_length)
+    header = None
+    final = False
+    chunks = aiter(chunks)
+    while not final:
+        try:
+            data = await anext(chunks)
+        except StopAsyncIteration:
+            data, final = b"", True
+        
+        batch = []
+        for line_no, record, error in splitter.feed(data, final):
+            if error is not None:
+                batch.append((line_no, None, error))
+                continue
+            if format != "csv":
+                try:
+                    batch.append((line_no, loads(record), None))
+                except ValueError as e:
+                    batch.append((line_no, None, f"Invalid JSON: {e}"))
+                continue
+            if header is None:
+                header = [name.strip() for name in next(csv.reader([record]))]
+                continue
+            try:
+                batch.append((line_no, decode_csv(record, header), None))
+            except (ValueError, csv.Error) as e:
+                batch.append((line_no, None, str(e)))
+        yield batch
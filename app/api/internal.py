@@ -0,0 +1,21 @@
+"""
+Доступ к служебным эндпоинтам (/internal/*, /metrics) по токену
+"""
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import settings
+
+
+async def verify_internal_token(x_internal_token: Optional[str] = Header(None)) -> None:
+    """
+    Проверка токена служебных эндпоинтов (заголовок X-Internal-Token).
+    Без заданного INTERNAL_API_TOKEN служебные эндпоинты недоступны
+    :param x_internal_token: токен из заголовка запроса
+    :return:
+    """
+    token = settings.INTERNAL_API_TOKEN
+    if not token or x_internal_token is None or not secrets.compare_digest(x_internal_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
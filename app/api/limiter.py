@@ -3,13 +3,41 @@
 """
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from starlette.requests import Request
 
+import app.core.rate_limit  # noqa: F401 - регистрирует схему hybrid+redis для limits
 from app.config import settings
+from app.core.redis import sync_redis_pool
+from app.core.security import decode_jwt_token, get_user_id_from_token
 
 app_rate_limit = settings.APP_RATE_LIMIT
 
+
+def get_rate_limit_key(request: Request) -> str:
+    """
+    Ключ лимита: ID пользователя из JWT-токена (токен проверяется через кэш token_cache),
+    а для анонимных запросов - IP-адрес клиента. Пользователи за одним NAT
+    получают отдельные лимиты.
+    :param request: HTTP-запрос
+    :return:
+    """
+    token = request.cookies.get("access_token")
+    if token:
+        try:
+            return f"user:{get_user_id_from_token(decode_jwt_token(token))}"
+        except Exception:
+            pass
+    return get_remote_address(request)
+
+
+# limits получает общий пул соединений Redis (см. app/core/redis.py)
+storage_options = {"connection_pool": sync_redis_pool}
+if settings.RATE_LIMIT_HYBRID:
+    storage_options.update(sync_interval=settings.RATE_LIMIT_SYNC_SECONDS, max_pending=settings.RATE_LIMIT_MAX_PENDING)
+
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=get_rate_limit_key,
     default_limits=[app_rate_limit],
-    storage_uri=settings.REDIS_URL
+    storage_uri=f"hybrid+{settings.REDIS_URL}" if settings.RATE_LIMIT_HYBRID else settings.REDIS_URL,
+    storage_options=storage_options
 )
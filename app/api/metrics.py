@@ -0,0 +1,153 @@
+"""
+Middleware метрик HTTP-запросов и коллекторы метрик кэшей и пулов
+"""
+import time
+
+from fastapi_cache import FastAPICache
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.api.limiter import limiter
+from app.core.cache import TwoTierBackend
+from app.core.events import task_events
+from app.core.metrics import registry, format_metric, REQUEST_LATENCY, RATE_LIMITED, CACHE_REQUESTS
+from app.core.rate_limit import HybridRedisStorage
+from app.core.redis import redis_pool, sync_redis_pool, redis_pool_stats
+from app.core.security import token_cache
+from app.db.database import engine, replicas
+from app.db.pool import pool_stats
+
+CACHE_STATUS_HEADER = b"x-fastapi-cache"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута запроса (например, /tasks/{task_id}), чтобы не плодить метки по ID
+    :param scope: ASGI scope
+    :return:
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # запрос отклонен до маршрутизации (например, лимитером) - ищем маршрут сами
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, которое записывает задержку запросов по шаблону маршрута и статусу,
+    отказы лимитера и попадания/промахи FastAPICache
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        cache_result = None
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, cache_result
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == CACHE_STATUS_HEADER:
+                        cache_result = value.decode()
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - started, scope["method"], route, str(status))
+            if status == 429:
+                RATE_LIMITED.inc(route)
+            if cache_result is not None:
+                CACHE_REQUESTS.inc(route, cache_result)
+
+
+def _collect_cache_tiers():
+    try:
+        backend = FastAPICache.get_backend()
+    except AssertionError:
+        return []
+    if not isinstance(backend, TwoTierBackend):
+        return []
+    samples = []
+    for key, value in backend.stats.items():
+        tier, _, event = key.partition("_")
+        samples.append(({"tier": tier, "event": event}, value))
+    return format_metric(
+        "fastapi_cache_tier_events_total", "counter", "Two-tier cache events by tier", samples
+    )
+
+
+def _collect_token_cache():
+    stats = token_cache.stats
+    samples = [({"event": key}, stats[key]) for key in ("hits", "misses", "evictions")]
+    return (
+        format_metric("jwt_cache_events_total", "counter", "Decoded JWT cache events", samples)
+        + format_metric("jwt_decode_seconds_total", "counter", "Time spent verifying JWT signatures",
+                        [({}, stats["decode_seconds"])])
+    )
+
+
+def _collect_db_pools():
+    samples = []
+    engines = [("primary", engine)] + [(f"replica{i}", replica.engine) for i, replica in enumerate(replicas.replicas)]
+    for name, pool_engine in engines:
+        stats = pool_stats(pool_engine)
+        for state in ("checked_out", "idle", "overflow"):
+            samples.append(({"engine": name, "state": state}, stats[state]))
+    return format_metric("db_pool_connections", "gauge", "Database pool connections by state", samples)
+
+
+def _collect_redis_pools():
+    connections = []
+    events = []
+    for name, pool in (("app", redis_pool), ("limiter", sync_redis_pool)):
+        stats = redis_pool_stats(pool)
+        for state in ("in_use", "idle"):
+            connections.append(({"pool": name, "state": state}, stats[state]))
+        for event in ("created", "acquired", "errors"):
+            events.append(({"pool": name, "event": event}, stats[event]))
+    return (
+        format_metric("redis_pool_connections", "gauge", "Redis pool connections by state", connections)
+        + format_metric("redis_pool_events_total", "counter", "Redis pool connection events", events)
+    )
+
+
+def _collect_rate_limit_storage():
+    storage = limiter.limiter.storage
+    if not isinstance(storage, HybridRedisStorage):
+        return []
+    samples = [({"event": key}, value) for key, value in storage.stats.items()]
+    return format_metric(
+        "rate_limit_storage_events_total", "counter", "Hybrid rate limit storage hits and Redis syncs", samples
+    )
+
+
+def _collect_task_events():
+    samples = [({"event": key}, value) for key, value in task_events.stats.items()]
+    return (
+        format_metric("task_events_total", "counter", "Task change feed events", samples)
+        + format_metric("task_event_connections", "gauge", "Open task change feed connections",
+                        [({}, task_events.connections)])
+    )
+
+
+registry.register_collector(_collect_cache_tiers)
+registry.register_collector(_collect_token_cache)
+registry.register_collector(_collect_db_pools)
+registry.register_collector(_collect_redis_pools)
+registry.register_collector(_collect_rate_limit_storage)
+registry.register_collector(_collect_task_events)
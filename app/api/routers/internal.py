@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+
+from app.api.internal import verify_internal_token
+from app.core.redis import redis_pool, sync_redis_pool, redis_pool_stats
+from app.db.database import engine, replicas
+from app.db.pool import pool_stats
+
+
+router = APIRouter(prefix="/internal", include_in_schema=False, dependencies=[Depends(verify_internal_token)])
+
+
+@router.get("/db/pool")
+async def get_db_pool_stats():
+    """
+    GET запрос состояния пулов соединений primary и реплик
+    :return:
+    """
+    return {
+        "primary": pool_stats(engine),
+        "replicas": [
+            {"url": replica.engine.url.render_as_string(hide_password=True), "healthy": replica.healthy,
+             **pool_stats(replica.engine)}
+            for replica in replicas.replicas
+        ],
+    }
+
+
+@router.get("/redis/pool")
+async def get_redis_pool_stats():
+    """
+    GET запрос состояния пулов соединений Redis
+    :return:
+    """
+    return {"app": redis_pool_stats(redis_pool), "limiter": redis_pool_stats(sync_redis_pool)}
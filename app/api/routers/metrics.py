@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.internal import verify_internal_token
+from app.api.limiter import limiter
+from app.core.metrics import registry
+
+router = APIRouter(include_in_schema=False, dependencies=[Depends(verify_internal_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+@limiter.exempt
+async def get_metrics():
+    """
+    GET запрос метрик в текстовом формате Prometheus
+    :return:
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
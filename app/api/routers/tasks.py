@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from fastapi_cache.decorator import cache
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.api.cache import user_key_builder, invalidate_user_cache, keep_cache_headers
+from app.api.etag import task_list_etag, task_etag
+from app.api.formats import (
+    encode_ndjson, encode_csv, encode_sse, decode_records, encode_task_page, MEDIA_TYPES, TASK_OUT_FIELDS,
+    RawJSONResponse
+)
 from app.config import settings
+from app.core.events import TaskEventHub
 from app.core.security import get_current_user_id
-from app.db.database import get_async_db
-from app.depends import get_task_service
-from app.schemas import TaskCreate, TaskUpdate, TaskOut
-from app.services import TaskService
+from app.db.database import get_async_db, get_read_db, get_read_session_factory, on_commit
+from app.depends import get_task_service, get_task_stats_service, get_task_event_hub
+from app.schemas import (
+    TaskCreate, TaskUpdate, TaskOut, TaskPage, TaskBulkUpdate, TaskBulkDelete, TaskBulkResult, TaskImportResult,
+    TaskStatsOut
+)
+from app.services import TaskService, TaskStatsService
 
 cache_ttl = settings.FASTAPI_CACHE_EXPIRE_SECONDS
 
+# ID события потока изменений (ID записи Redis Stream)
+EVENT_ID_PATTERN = r"^\d+-\d+$"
+
 router = APIRouter()
 
 
@@ -30,36 +47,288 @@ async def create_task(
     :return:
     """
     try:
-        return await task_service.create_task(db, task_data, user_id)
+        task = await task_service.create_task(db, task_data, user_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return task
 
 
-@router.get("/tasks", response_model=list[TaskOut])
-@cache(expire=cache_ttl)
-async def get_tasks(
+@router.post("/tasks/bulk", response_model=list[TaskBulkResult])
+async def create_tasks_bulk(
+        tasks_data: list[TaskCreate],
+        db: AsyncSession = Depends(get_async_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    POST запрос создания нескольких задач в одной транзакции.
+    :param tasks_data: список данных задач
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return: результат для каждой задачи
+    """
+    try:
+        tasks = await task_service.create_tasks(db, tasks_data, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return [
+        TaskBulkResult.model_validate({"id": task.id, "status": "created", "task": task}, from_attributes=True)
+        for task in tasks
+    ]
+
+
+@router.put("/tasks/bulk", response_model=list[TaskBulkResult])
+async def update_tasks_bulk(
+        tasks_data: list[TaskBulkUpdate],
         db: AsyncSession = Depends(get_async_db),
         task_service: TaskService = Depends(get_task_service),
         user_id: int = Depends(get_current_user_id)
 ):
     """
-    GET запрос получения списка задач.
+    PUT запрос обновления нескольких задач в одной транзакции.
+    :param tasks_data: список данных задач с ID задачи
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return: результат для каждой задачи
+    """
+    try:
+        tasks = await task_service.update_tasks(db, tasks_data, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return [
+        TaskBulkResult.model_validate(
+            {"id": task_data.id, "status": "updated" if task else "not_found", "task": task},
+            from_attributes=True
+        )
+        for task_data, task in zip(tasks_data, tasks)
+    ]
+
+
+@router.delete("/tasks/bulk", response_model=list[TaskBulkResult])
+async def delete_tasks_bulk(
+        tasks_data: TaskBulkDelete,
+        db: AsyncSession = Depends(get_async_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    DELETE запрос удаления нескольких задач в одной транзакции.
+    :param tasks_data: список ID задач
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return: результат для каждой задачи
+    """
+    try:
+        deleted = await task_service.delete_tasks(db, tasks_data.ids, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return [
+        TaskBulkResult(id=task_id, status="deleted" if is_deleted else "not_found")
+        for task_id, is_deleted in zip(tasks_data.ids, deleted)
+    ]
+
+
+@router.post("/tasks/import", response_model=TaskImportResult)
+async def import_tasks(
+        request: Request,
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        db: AsyncSession = Depends(get_async_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    POST запрос потокового импорта задач из NDJSON или CSV (с заголовком) в одной транзакции.
+    Тело запроса читается и загружается пачками, некорректные строки пропускаются
+    и возвращаются в списке ошибок.
+    :param request: HTTP-запрос
+    :param format: формат загрузки (ndjson или csv)
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return: количество загруженных задач, скорость загрузки и ошибки по строкам
+    """
+    try:
+        result = await task_service.import_tasks(db, decode_records(
+            request.stream(), format, settings.TASKS_IMPORT_MAX_RECORD_LENGTH
+        ), user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return result
+
+
+@router.get("/tasks/export")
+async def export_tasks(
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        session_factory: async_sessionmaker = Depends(get_read_session_factory),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    GET запрос потоковой выгрузки всех задач пользователя в NDJSON или CSV.
+    Строки читаются серверным курсором и отправляются по мере чтения,
+    поэтому расход памяти не зависит от количества задач.
+    :param format: формат выгрузки (ndjson или csv)
+    :param session_factory: фабрика read-only сессий
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    async def content():
+        # сессия зависимости закрывается до отправки тела ответа, поэтому открываем свою
+        async with session_factory() as db:
+            header = True
+            async for rows in task_service.stream_tasks(db, user_id):
+                if format == "csv":
+                    yield encode_csv(rows, header=header)
+                    header = False
+                else:
+                    yield encode_ndjson(rows)
+            if format == "csv" and header:
+                yield encode_csv([], header=True)
+    
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+
+@router.get("/tasks", response_model=TaskPage, dependencies=[Depends(task_list_etag)])
+@keep_cache_headers
+@cache(expire=cache_ttl, namespace="tasks", key_builder=user_key_builder)
+async def get_tasks(
+        limit: int = Query(settings.TASKS_PAGE_LIMIT, ge=1, le=settings.TASKS_PAGE_MAX_LIMIT),
+        after: Optional[str] = None,
+        sort: str = Query("id", pattern="^-?(id|title)$"),
+        is_completed: Optional[bool] = None,
+        title_prefix: Optional[str] = Query(None, max_length=256),
+        db: AsyncSession = Depends(get_read_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    GET запрос получения страницы списка задач с фильтрами и сортировкой.
+    Параметры фильтров входят в ключ кэша (см. user_key_builder).
+    :param limit: максимальное количество задач на странице
+    :param after: курсор следующей страницы (next_cursor из предыдущего ответа)
+    :param sort: сортировка: id, title, -id или -title (по убыванию)
+    :param is_completed: фильтр по статусу выполнения
+    :param title_prefix: фильтр по префиксу названия
+    :param db: сессия SQLAlchemy
+    :param task_service: сервис задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    try:
+        if settings.TASKS_FAST_JSON:
+            # только нужные колонки, без ORM-объектов и повторной валидации ответа
+            rows, next_cursor = await task_service.get_tasks_page(
+                db, user_id, limit, after, sort=sort, is_completed=is_completed, title_prefix=title_prefix,
+                columns=TASK_OUT_FIELDS
+            )
+            return RawJSONResponse(encode_task_page(rows, next_cursor))
+        
+        tasks, next_cursor = await task_service.get_tasks_page(
+            db, user_id, limit, after, sort=sort, is_completed=is_completed, title_prefix=title_prefix
+        )
+        return TaskPage.model_validate({"items": tasks, "next_cursor": next_cursor}, from_attributes=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/tasks/stats", response_model=TaskStatsOut, dependencies=[Depends(task_list_etag)])
+@cache(expire=cache_ttl, namespace="tasks", key_builder=user_key_builder)
+async def get_tasks_stats(
+        db: AsyncSession = Depends(get_read_db),
+        task_stats_service: TaskStatsService = Depends(get_task_stats_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    GET запрос количества задач пользователя: всего, выполненных и невыполненных.
+    :param db: сессия SQLAlchemy
+    :param task_stats_service: сервис счетчиков задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    return await task_stats_service.get_stats(db, user_id)
+
+
+@router.get("/tasks/search", response_model=TaskPage, dependencies=[Depends(task_list_etag)])
+@cache(expire=cache_ttl, namespace="tasks", key_builder=user_key_builder)
+async def search_tasks(
+        q: str = Query(..., min_length=1, max_length=256),
+        limit: int = Query(settings.TASKS_PAGE_LIMIT, ge=1, le=settings.TASKS_PAGE_MAX_LIMIT),
+        after: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db),
+        task_service: TaskService = Depends(get_task_service),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    GET запрос полнотекстового поиска задач по названию и описанию.
+    Задачи упорядочены по релевантности.
+    :param q: поисковый запрос (слова, "фраза в кавычках", or, -исключение)
+    :param limit: максимальное количество задач на странице
+    :param after: курсор следующей страницы (next_cursor из предыдущего ответа)
     :param db: сессия SQLAlchemy
     :param task_service: сервис задач
     :param user_id: ID текущего пользователя
     :return:
     """
     try:
-        return await task_service.get_tasks_by_user(db, user_id)
+        tasks, next_cursor = await task_service.search_tasks(db, user_id, q, limit, after)
+        return TaskPage.model_validate({"items": tasks, "next_cursor": next_cursor}, from_attributes=True)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/tasks/{task_id}", response_model=TaskOut)
-@cache(expire=cache_ttl)
+@router.get("/tasks/events")
+async def stream_task_events(
+        offset: Optional[str] = Query(None, pattern=EVENT_ID_PATTERN),
+        last_event_id: Optional[str] = Header(None, pattern=EVENT_ID_PATTERN),
+        event_hub: TaskEventHub = Depends(get_task_event_hub),
+        user_id: int = Depends(get_current_user_id)
+):
+    """
+    GET запрос потока изменений задач пользователя (Server-Sent Events).
+    События task содержат тип изменения (created, updated, deleted, imported) и данные задачи.
+    Первое событие нового соединения - ready с текущим смещением; при переподключении клиент
+    передает ID последнего полученного события (заголовок Last-Event-ID или offset) и получает
+    пропущенные события. Если они уже удалены из журнала, приходит событие reset:
+    клиенту нужно перечитать список задач.
+    :param offset: ID последнего полученного события (для первого подключения)
+    :param last_event_id: ID последнего полученного события (заголовок Last-Event-ID)
+    :param event_hub: поток изменений задач
+    :param user_id: ID текущего пользователя
+    :return:
+    """
+    if event_hub.connections >= event_hub.max_connections:
+        raise HTTPException(status_code=503, detail="Too many event stream connections")
+    
+    async def content():
+        events = event_hub.events(user_id, last_event_id or offset, settings.TASK_EVENTS_HEARTBEAT_SECONDS)
+        async for event_id, event, data in events:
+            yield encode_sse(event_id, event, data)
+    
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES["sse"],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/tasks/{task_id}", response_model=TaskOut, dependencies=[Depends(task_etag)])
+@cache(expire=cache_ttl, namespace="tasks", key_builder=user_key_builder)
 async def get_task(
         task_id: int,
-        db: AsyncSession = Depends(get_async_db),
+        db: AsyncSession = Depends(get_read_db),
         task_service: TaskService = Depends(get_task_service),
         user_id: int = Depends(get_current_user_id)
 ):
@@ -96,9 +365,10 @@ async def update_task(
     """
     try:
         task = await task_service.update_task(db, task_id, task_data, user_id)
-        return task
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return task
 
 
 @router.delete("/tasks/{task_id}")
@@ -118,6 +388,7 @@ async def delete_task(
     """
     try:
         await task_service.delete_task(db, task_id, user_id)
-        return {"detail": "Task deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    on_commit(db, partial(invalidate_user_cache, user_id))
+    return {"detail": "Task deleted successfully"}
@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic_core import MultiHostUrl
 from pydantic import PostgresDsn
@@ -12,18 +14,74 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int
     POSTGRES_DB: str
     
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_ECHO: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    SLOW_QUERY_SECONDS: float = 0.2
+    N_PLUS_ONE_THRESHOLD: int = 10
+    
+    # DSN реплик для чтения с асинхронным драйвером (JSON-список)
+    POSTGRES_REPLICA_URLS: List[str] = []
+    REPLICA_BALANCING: str = "round_robin"  # round_robin или least_connections
+    REPLICA_HEALTH_CHECK_SECONDS: int = 5
+    READ_YOUR_WRITES_SECONDS: int = 5
+    
     REDIS_URL: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50  # на пул процесса
+    REDIS_POOL_TIMEOUT: float = 5  # ожидание свободного соединения
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
     
     APP_RATE_LIMIT: str
+    RATE_LIMIT_HYBRID: bool = True
+    RATE_LIMIT_SYNC_SECONDS: float = 0.5
+    RATE_LIMIT_MAX_PENDING: int = 10
     
     FASTAPI_CACHE_EXPIRE_SECONDS: int
+    CACHE_LOCAL_MAX_ITEMS: int = 10000
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_LOCAL_TTL_SECONDS: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = "fastapi-cache:invalidate"
+    CACHE_SINGLE_FLIGHT: bool = True
+    CACHE_LOCK_SECONDS: float = 5
+    CACHE_STALE_SECONDS: int = 0
+    
+    TASKS_PAGE_LIMIT: int = 100
+    TASKS_PAGE_MAX_LIMIT: int = 1000
+    TASKS_BULK_MAX_ITEMS: int = 5000
+    TASKS_EXPORT_BATCH_SIZE: int = 1000
+    TASKS_IMPORT_CHUNK_SIZE: int = 10000
+    TASKS_IMPORT_MAX_ERRORS: int = 100
+    TASKS_IMPORT_MAX_RECORD_LENGTH: int = 65536
+    TASK_STATS_RECONCILE_BATCH_SIZE: int = 1000
+    TASK_PARTITION_BACKFILL_BATCH_SIZE: int = 5000
+    TASK_PARTITION_BACKFILL_PAUSE_SECONDS: float = 0.05
+    TASKS_FAST_JSON: bool = False
+    
+    TASK_EVENTS_CHANNEL: str = "tasks:events"
+    TASK_EVENTS_STREAM_MAXLEN: int = 1000
+    TASK_EVENTS_STREAM_TTL_SECONDS: int = 86400
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+    TASK_EVENTS_HEARTBEAT_SECONDS: float = 15
+    TASK_EVENTS_MAX_CONNECTIONS: int = 20000
     
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    JWT_CACHE_MAX_SIZE: int = 10000
+    JWT_CACHE_TTL_SECONDS: int = 300
     SALT: str
     
+    INTERNAL_ENDPOINTS_ENABLED: bool = False
+    INTERNAL_API_TOKEN: Optional[str] = None
+    # процессов bcrypt на воркер uvicorn (всего - воркеры * PASSWORD_HASH_WORKERS, не больше ядер)
+    PASSWORD_HASH_WORKERS: int = 2
+    
     def SQLALCHEMY_DATABASE_URL(self, async_driver: bool = True) -> PostgresDsn:
         return MultiHostUrl.build(
             scheme=self.POSTGRES_ASYNC_SCHEME if async_driver else self.POSTGRES_SCHEME,
@@ -34,6 +92,16 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         ).unicode_string()
     
+    def REDIS_POOL_OPTIONS(self) -> Dict[str, Any]:
+        return dict(
+            max_connections=self.REDIS_MAX_CONNECTIONS,
+            timeout=self.REDIS_POOL_TIMEOUT,
+            socket_timeout=self.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=self.REDIS_SOCKET_CONNECT_TIMEOUT,
+            socket_keepalive=True,
+            health_check_interval=self.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    
     class Config:
         env_file = 'example.env'
 
@@ -0,0 +1,429 @@
+"""
+Двухуровневый бэкенд FastAPICache: локальный LRU-кэш процесса перед Redis
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError, RedisError
+
+from app.core.redis import execute_pipelined
+
+logger = logging.getLogger(__name__)
+
+# Таймаут ожидания сообщения pub/sub (блокирующее чтение упиралось бы в socket_timeout пула)
+LISTEN_POLL_SECONDS = 1.0
+# Префикс блокировок вычисления значений и интервал проверки результата другого воркера
+LOCK_PREFIX = "fastapi-cache:lock:"
+LOCK_POLL_SECONDS = 0.05
+
+
+class _Flight:
+    """
+    Вычисление значения ключа, которое выполняется одним запросом воркера:
+    остальные запросы этого ключа ждут future
+    """
+    __slots__ = ("key", "future", "lock", "locked")
+    
+    def __init__(self, key: str, lock: Lock):
+        self.key = key
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.lock = lock
+        self.locked = False
+
+
+class TwoTierBackend(Backend):
+    """
+    Бэкенд кэша с локальным LRU-кэшем (ограниченным по количеству записей,
+    объему и TTL) перед RedisBackend.
+    
+    Инвалидация локальных кэшей всех воркеров выполняется через Redis pub/sub:
+    при очистке ключа или пространства имен публикуется сообщение, которое
+    каждый воркер применяет к своему локальному кэшу.
+    
+    При single_flight одновременные промахи по одному ключу не приводят к «лавине» запросов к БД:
+    в воркере значение вычисляет первый запрос, а остальные ждут его результат;
+    между воркерами вычисление координируется короткой блокировкой в Redis
+    (не дольше lock_timeout), остальные воркеры ждут появления значения в Redis.
+    Если лидер завершился без сохранения значения (ошибка эндпоинта), ожидающие запросы
+    вычисляют значение сами.
+    При stale_ttl > 0 записи хранятся в Redis на stale_ttl секунд дольше TTL:
+    истекшее значение отдается сразу, пока один запрос обновляет его (stale-while-revalidate).
+    """
+    
+    def __init__(
+            self,
+            redis: Redis,
+            channel: str,
+            max_items: int,
+            max_bytes: int,
+            local_ttl: int,
+            single_flight: bool = False,
+            lock_timeout: float = 5,
+            stale_ttl: int = 0
+    ):
+        self.redis = redis
+        self.remote = RedisBackend(redis)
+        self.channel = channel
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.local_ttl = local_ttl
+        self.single_flight = single_flight
+        self.lock_timeout = lock_timeout
+        self.stale_ttl = stale_ttl if single_flight else 0
+        
+        self._flights: Dict[str, _Flight] = {}
+        self._background: set = set()
+        self._local: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._local_bytes = 0
+        self._listener: Optional[asyncio.Task] = None
+        # номер последней инвалидации локального кэша: значение, прочитанное из Redis
+        # до инвалидации, не должно попасть в локальный кэш после нее
+        self.invalidation_epoch = 0
+        
+        self.stats: Dict[str, int] = {
+            "local_hits": 0,
+            "local_misses": 0,
+            "local_evictions": 0,
+            "local_expirations": 0,
+            "remote_hits": 0,
+            "remote_misses": 0,
+            "invalidations": 0,
+            "flight_leaders": 0,
+            "flight_coalesced": 0,
+            "flight_remote_waits": 0,
+            "flight_stale_served": 0,
+        }
+    
+    def get_local(self, key: str) -> Optional[Tuple[int, bytes]]:
+        """
+        Получение значения из локального кэша
+        :param key: ключ
+        :return: оставшийся TTL и значение или None, если значения нет
+        """
+        entry = self._local.get(key)
+        if entry is None:
+            self.stats["local_misses"] += 1
+            return None
+        
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._pop_local(key)
+            self.stats["local_expirations"] += 1
+            self.stats["local_misses"] += 1
+            return None
+        
+        self._local.move_to_end(key)
+        self.stats["local_hits"] += 1
+        return int(expires_at - now) + 1, value
+    
+    def set_local(self, key: str, value: bytes, expire: Optional[int] = None, epoch: Optional[int] = None) -> None:
+        """
+        Сохранение значения в локальный кэш.
+        TTL локальной записи не превышает local_ttl, самые старые записи
+        вытесняются при превышении max_items или max_bytes.
+        :param key: ключ
+        :param value: значение
+        :param expire: TTL значения в Redis
+        :param epoch: invalidation_epoch до чтения значения из Redis: если с тех пор
+            пришла инвалидация, значение могло устареть и не сохраняется
+        :return:
+        """
+        if epoch is not None and epoch != self.invalidation_epoch:
+            return
+        ttl = min(expire, self.local_ttl) if expire else self.local_ttl
+        size = len(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        
+        self._pop_local(key)
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local_bytes += size
+        while len(self._local) > self.max_items or self._local_bytes > self.max_bytes:
+            _, (_, evicted) = self._local.popitem(last=False)
+            self._local_bytes -= len(evicted)
+            self.stats["local_evictions"] += 1
+    
+    def _pop_local(self, key: str) -> None:
+        entry = self._local.pop(key, None)
+        if entry is not None:
+            self._local_bytes -= len(entry[1])
+    
+    def _clear_local(self, namespace: Optional[str] = None, key: Optional[str] = None) -> None:
+        self.invalidation_epoch += 1
+        if namespace:
+            for local_key in [k for k in self._local if k.startswith(f"{namespace}:")]:
+                self._pop_local(local_key)
+        elif key:
+            self._pop_local(key)
+        else:
+            self._local.clear()
+            self._local_bytes = 0
+    
+    def _remote_entry(
+            self,
+            key: str,
+            ttl: int,
+            value: Optional[bytes],
+            epoch: int
+    ) -> Tuple[int, Optional[bytes], bool]:
+        """
+        Обработка значения из Redis: учет статистики, stale-периода и сохранение в локальный кэш
+        :param key: ключ
+        :param ttl: TTL в Redis
+        :param value: значение
+        :param epoch: invalidation_epoch до чтения значения из Redis
+        :return: TTL без stale-периода, значение и признак истекшего значения
+        """
+        if value is None:
+            self.stats["remote_misses"] += 1
+            return ttl, None, False
+        
+        self.stats["remote_hits"] += 1
+        if self.stale_ttl and ttl > 0:
+            ttl -= self.stale_ttl
+            if ttl <= 0:
+                return 0, value, True
+        self.set_local(key, value, ttl if ttl > 0 else None, epoch)
+        return ttl, value, False
+    
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        local = self.get_local(key)
+        if local is not None:
+            return local
+        
+        epoch = self.invalidation_epoch
+        ttl, value = await self.remote.get_with_ttl(key)
+        ttl, value, stale = self._remote_entry(key, ttl, value, epoch)
+        if value is not None and not stale:
+            return ttl, value
+        if not self.single_flight:
+            return ttl, None
+        
+        flight = self._flights.get(key)
+        if flight is not None:
+            if stale:
+                # значение уже обновляется - отдаем истекшее
+                self.stats["flight_stale_served"] += 1
+                return 0, value
+            self.stats["flight_coalesced"] += 1
+            return await self._wait_flight(flight)
+        
+        flight = self._start_flight(key)
+        if await self._acquire_lock(flight):
+            # промах для лидера: эндпоинт вычисляет значение, set завершает вычисление
+            self.stats["flight_leaders"] += 1
+            return 0, None
+        if stale:
+            # значение обновляет другой воркер
+            self._finish_flight(flight, None)
+            self.stats["flight_stale_served"] += 1
+            return 0, value
+        
+        self.stats["flight_remote_waits"] += 1
+        ttl, value = await self._wait_remote(key, flight.lock.name)
+        if value is not None:
+            self._finish_flight(flight, (ttl, value))
+        return ttl, value
+    
+    def _start_flight(self, key: str) -> _Flight:
+        flight = self._flights[key] = _Flight(key, self.redis.lock(LOCK_PREFIX + key, timeout=self.lock_timeout))
+        # если запрос-лидер завершится без set (ошибка эндпоинта), ожидающие запросы не ждут таймаута
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: self._finish_flight(flight, None))
+        return flight
+    
+    def _finish_flight(self, flight: _Flight, result: Optional[Tuple[int, bytes]]) -> None:
+        if not flight.future.done():
+            flight.future.set_result(result)
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if flight.locked:
+            flight.locked = False
+            task = asyncio.get_running_loop().create_task(self._release_lock(flight.lock))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+    
+    async def _acquire_lock(self, flight: _Flight) -> bool:
+        try:
+            flight.locked = await flight.lock.acquire(blocking=False)
+        except RedisError:
+            # без Redis значение вычисляется без координации между воркерами
+            logger.warning("Cache lock failed for key '%s'", flight.key, exc_info=True)
+            return True
+        return flight.locked
+    
+    @staticmethod
+    async def _release_lock(lock: Lock) -> None:
+        try:
+            await lock.release()
+        except (LockError, RedisError):
+            # блокировка истекла или Redis недоступен: она освободится по таймауту
+            pass
+    
+    async def _wait_flight(self, flight: _Flight) -> Tuple[int, Optional[bytes]]:
+        try:
+            result = await asyncio.wait_for(asyncio.shield(flight.future), self.lock_timeout)
+        except asyncio.TimeoutError:
+            result = None
+        return result if result is not None else (0, None)
+    
+    async def _wait_remote(self, key: str, lock_name: str) -> Tuple[int, Optional[bytes]]:
+        """
+        Ожидание значения, которое вычисляет другой воркер: пока он держит блокировку,
+        но не дольше lock_timeout
+        :param key: ключ
+        :param lock_name: ключ блокировки
+        :return: TTL и значение или промах
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            epoch = self.invalidation_epoch
+            ttl, value, locked = await execute_pipelined(
+                self.redis, [("TTL", key), ("GET", key), ("EXISTS", lock_name)]
+            )
+            if value is not None:
+                ttl, value, _ = self._remote_entry(key, ttl, value, epoch)
+                return ttl, value
+            if not locked:
+                break
+        return 0, None
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        _, value = await self.get_with_ttl(key)
+        return value
+    
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        try:
+            await self.remote.set(key, value, expire + self.stale_ttl if expire and self.stale_ttl else expire)
+            self.set_local(key, value, expire)
+        finally:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._finish_flight(flight, (expire or 0, value))
+    
+    async def get_many(self, keys: Sequence[str]) -> List[Tuple[int, Optional[bytes]]]:
+        """
+        Получение нескольких значений: отсутствующие в локальном кэше ключи
+        читаются из Redis одним pipeline
+        :param keys: ключи
+        :return: TTL и значение (или None) для каждого ключа
+        """
+        results: List[Optional[Tuple[int, Optional[bytes]]]] = [self.get_local(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        
+        commands = []
+        for i in missing:
+            commands.extend((("TTL", keys[i]), ("GET", keys[i])))
+        epoch = self.invalidation_epoch
+        replies = await execute_pipelined(self.redis, commands)
+        for n, i in enumerate(missing):
+            ttl, value, stale = self._remote_entry(keys[i], replies[2 * n], replies[2 * n + 1], epoch)
+            results[i] = ttl, None if stale else value
+        return results
+    
+    async def set_many(self, items: Sequence[Tuple[str, bytes]], expire: Optional[int] = None) -> None:
+        """
+        Сохранение нескольких значений в Redis одним pipeline и в локальный кэш
+        :param items: пары ключ-значение
+        :param expire: TTL, с
+        :return:
+        """
+        await execute_pipelined(
+            self.redis,
+            [("SET", key, value, "EX", expire + self.stale_ttl) if expire else ("SET", key, value) for key, value in items]
+        )
+        for key, value in items:
+            self.set_local(key, value, expire)
+    
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        self._clear_local(namespace, key)
+        result = await self.remote.clear(namespace, key)
+        await self.publish_invalidation(namespace, key)
+        return result
+    
+    async def invalidate(self, key: str, *commands: Tuple[Any, ...]) -> List[Any]:
+        """
+        Удаление ключа из локальных кэшей всех воркеров (значение в Redis не изменяется)
+        :param key: ключ
+        :param commands: команды Redis, которые выполняются перед публикацией инвалидации
+            в том же pipeline (например, изменение самого ключа)
+        :return: результаты commands
+        """
+        message = self.invalidation_message(key=key)
+        results = await execute_pipelined(self.redis, [*commands, ("PUBLISH", self.channel, message)])
+        self._clear_local(key=key)
+        return results[:-1]
+    
+    @staticmethod
+    def invalidation_message(namespace: Optional[str] = None, key: Optional[str] = None) -> str:
+        return json.dumps({"namespace": namespace, "key": key})
+    
+    async def publish_invalidation(self, namespace: Optional[str] = None, key: Optional[str] = None) -> None:
+        """
+        Публикация сообщения об инвалидации в канал pub/sub
+        :param namespace: пространство имен
+        :param key: ключ
+        :return:
+        """
+        await self.redis.publish(self.channel, self.invalidation_message(namespace, key))
+    
+    async def _listen(self) -> None:
+        """
+        Применение сообщений об инвалидации от других воркеров.
+        При потере соединения с Redis сообщения могут быть пропущены,
+        поэтому локальный кэш в этом случае очищается полностью.
+        Подписка занимает одно соединение пула.
+        """
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_POLL_SECONDS)
+                    if message is None:
+                        continue
+                    data = json.loads(message["data"])
+                    self._clear_local(data.get("namespace"), data.get("key"))
+                    self.stats["invalidations"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener failed, clearing local cache", exc_info=True)
+                self._clear_local()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+    
+    def start(self) -> None:
+        """
+        Запуск фоновой задачи, слушающей канал инвалидации
+        :return:
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self) -> None:
+        """
+        Остановка фоновой задачи, слушающей канал инвалидации
+        :return:
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
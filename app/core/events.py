@@ -0,0 +1,321 @@
+"""
+Поток изменений задач пользователей: журнал событий в Redis Streams и рассылка по воркерам через pub/sub
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.core.redis import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Таймаут ожидания сообщения pub/sub (блокирующее чтение упиралось бы в socket_timeout пула)
+LISTEN_POLL_SECONDS = 1.0
+# Смещение «событий еще не было»
+START_ID = "0-0"
+# Количество событий, читаемых из журнала за один запрос
+REPLAY_BATCH_SIZE = 100
+
+# Добавление события в журнал пользователя (с ограничением длины и TTL журнала)
+# и публикация «<user_id> <id события> <данные>» в канал воркеров - за один round trip
+PUBLISH_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', ARGV[4], ARGV[5] .. ' ' .. id .. ' ' .. ARGV[2])
+return id
+"""
+
+
+def _id_key(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class Subscription:
+    """
+    Подписка соединения на события пользователя: очередь ограниченного размера.
+    При переполнении очередь очищается, а соединение дочитывает пропущенные события из журнала.
+    """
+    __slots__ = ("user_id", "queue", "overflowed")
+    
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+    
+    def put(self, event_id: str, data: str) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait((event_id, data))
+            return True
+        except asyncio.QueueFull:
+            self.overflow()
+            return False
+    
+    def overflow(self) -> None:
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # будим ожидающее соединение
+        self.queue.put_nowait(None)
+
+
+class TaskEventHub:
+    """
+    Журнал и рассылка событий изменения задач.
+    
+    События пользователя добавляются в Redis Stream tasks:events:<user_id> (ID записи -
+    смещение для возобновления), ограниченный stream_maxlen записями и stream_ttl секундами
+    без изменений. Каждый воркер держит одну подписку pub/sub на канал channel и раздает
+    события своим соединениям по словарю user_id -> подписки, поэтому стоимость простаивающего
+    соединения - одна ограниченная очередь, а не соединение с Redis.
+    """
+    
+    def __init__(
+            self,
+            redis: Redis,
+            channel: str,
+            stream_maxlen: int,
+            stream_ttl: int,
+            queue_size: int,
+            max_connections: int
+    ):
+        self.redis = redis
+        self.channel = channel
+        self.stream_maxlen = stream_maxlen
+        self.stream_ttl = stream_ttl
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.script = redis.register_script(PUBLISH_SCRIPT)
+        
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._connections = 0
+        self._listener: Optional[asyncio.Task] = None
+        
+        self.stats: Dict[str, int] = {
+            "published": 0,
+            "received": 0,
+            "delivered": 0,
+            "dropped": 0,
+            "replayed": 0,
+            "resets": 0,
+        }
+    
+    @staticmethod
+    def stream_key(user_id: int) -> str:
+        return f"tasks:events:{user_id}"
+    
+    @property
+    def connections(self) -> int:
+        return self._connections
+    
+    async def publish(self, user_id: int, events: List[str]) -> List[str]:
+        """
+        Добавление событий в журнал пользователя и рассылка всем воркерам (одним pipeline).
+        Публикация выполняется после коммита, поэтому ошибка Redis не прерывает запрос, а только логируется.
+        :param user_id: ID пользователя
+        :param events: данные событий (JSON)
+        :return: ID событий
+        """
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for data in events:
+                    await self.script(
+                        keys=[self.stream_key(user_id)],
+                        args=[self.stream_maxlen, data, self.stream_ttl, self.channel, user_id],
+                        client=pipe
+                    )
+                ids = await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to publish %d task events for user %s", len(events), user_id, exc_info=True)
+            return []
+        self.stats["published"] += len(ids)
+        return ids
+    
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Подписка на события пользователя
+        :param user_id: ID пользователя
+        :return:
+        """
+        if self._connections >= self.max_connections:
+            raise ValueError("Too many event stream connections")
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        self._connections += 1
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Отмена подписки
+        :param subscription: подписка
+        :return:
+        """
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+        self._connections -= 1
+    
+    async def last_id(self, user_id: int) -> str:
+        """
+        ID последнего события пользователя
+        :param user_id: ID пользователя
+        :return: ID или START_ID, если событий нет
+        """
+        entries = await self.redis.xrevrange(self.stream_key(user_id), count=1)
+        return entries[0][0] if entries else START_ID
+    
+    async def replay(self, user_id: int, after: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        События журнала после смещения after (не больше REPLAY_BATCH_SIZE)
+        :param user_id: ID пользователя
+        :param after: ID последнего полученного клиентом события
+        :return: ID и данные событий или None, если часть событий после after уже удалена из журнала
+        """
+        key = self.stream_key(user_id)
+        if after == START_ID:
+            # журнал мог быть обрезан, если событий было не меньше stream_maxlen
+            if await self.redis.xlen(key) >= self.stream_maxlen:
+                return None
+            entries = await self.redis.xrange(key, count=REPLAY_BATCH_SIZE)
+        else:
+            # ищем само событие after: если его нет, журнал был обрезан или истек
+            entries = await self.redis.xrange(key, min=after, count=REPLAY_BATCH_SIZE + 1)
+            if not entries or entries[0][0] != after:
+                return None
+            entries = entries[1:]
+        return [(event_id, fields["data"]) for event_id, fields in entries]
+    
+    async def events(
+            self,
+            user_id: int,
+            last_event_id: Optional[str],
+            heartbeat: float
+    ) -> AsyncIterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Поток событий пользователя для одного соединения: сначала события журнала
+        после last_event_id, затем новые события.
+        :param user_id: ID пользователя
+        :param last_event_id: ID последнего полученного клиентом события
+        :param heartbeat: интервал пустых сообщений поддержания соединения, с
+        :return: асинхронный итератор (ID, тип, данные) событий; (None, None, None) - heartbeat.
+            Тип reset означает, что события после last_event_id потеряны и клиенту нужно
+            перечитать задачи, ready - что клиент получил все события до ID
+        """
+        subscription = self.subscribe(user_id)
+        try:
+            if last_event_id is None:
+                last_event_id = await self.last_id(user_id)
+                yield last_event_id, "ready", "{}"
+            
+            while True:
+                # новые события копятся в очереди подписки, поэтому журнал дочитывается без пропусков
+                subscription.overflowed = False
+                while True:
+                    entries = await self.replay(user_id, last_event_id)
+                    if entries is None:
+                        self.stats["resets"] += 1
+                        last_event_id = await self.last_id(user_id)
+                        yield last_event_id, "reset", "{}"
+                        break
+                    self.stats["replayed"] += len(entries)
+                    for event_id, data in entries:
+                        last_event_id = event_id
+                        yield event_id, "task", data
+                    if len(entries) < REPLAY_BATCH_SIZE:
+                        break
+                
+                while True:
+                    try:
+                        item = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield None, None, None
+                        continue
+                    if item is None:
+                        # очередь переполнилась - дочитываем пропущенное из журнала
+                        break
+                    event_id, data = item
+                    if _id_key(event_id) <= _id_key(last_event_id):
+                        # уже отправлено из журнала
+                        continue
+                    last_event_id = event_id
+                    yield event_id, "task", data
+        finally:
+            self.unsubscribe(subscription)
+    
+    def _dispatch(self, message: str) -> None:
+        user_id, event_id, data = message.split(" ", 2)
+        self.stats["received"] += 1
+        for subscription in self._subscriptions.get(int(user_id), ()):
+            if subscription.put(event_id, data):
+                self.stats["delivered"] += 1
+            else:
+                self.stats["dropped"] += 1
+    
+    def _overflow_all(self) -> None:
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                if not subscription.overflowed:
+                    subscription.overflow()
+    
+    async def _listen(self) -> None:
+        """
+        Рассылка событий из канала pub/sub соединениям воркера.
+        При потере соединения с Redis события могут быть пропущены,
+        поэтому все соединения дочитывают их из журнала.
+        """
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_POLL_SECONDS)
+                    if message is not None:
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Task event listener failed, replaying events from streams", exc_info=True)
+                self._overflow_all()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+    
+    def start(self) -> None:
+        """
+        Запуск фоновой задачи, слушающей канал событий
+        :return:
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self) -> None:
+        """
+        Остановка фоновой задачи, слушающей канал событий
+        :return:
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+task_events = TaskEventHub(
+    Redis(connection_pool=redis_pool),
+    channel=settings.TASK_EVENTS_CHANNEL,
+    stream_maxlen=settings.TASK_EVENTS_STREAM_MAXLEN,
+    stream_ttl=settings.TASK_EVENTS_STREAM_TTL_SECONDS,
+    queue_size=settings.TASK_EVENTS_QUEUE_SIZE,
+    max_connections=settings.TASK_EVENTS_MAX_CONNECTIONS
+)
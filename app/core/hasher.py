@@ -0,0 +1,88 @@
+"""
+Хэширование и проверка паролей в пуле процессов
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.core.metrics import PASSWORD_HASH_LATENCY
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Процессы пула не форкаются от воркера: к моменту создания пула в нем уже работают потоки
+# (синхронизация лимитера, пулы Redis), и копия блокировки, захваченной другим потоком,
+# навсегда останавливала бы дочерний процесс
+MP_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Хэширование паролей bcrypt в пуле процессов.
+    Каждый вызов bcrypt занимает 100-300 мс CPU, поэтому выполнение в event loop
+    блокирует все остальные запросы воркера. Пул процессов создается лениво,
+    чтобы не наследоваться при форке воркеров uvicorn.
+    
+    Пул создается в каждом воркере uvicorn, поэтому всего процессов bcrypt
+    (количество воркеров) * max_workers. При max_workers=0 хэширование
+    выполняется в текущем процессе.
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.max_workers:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context(MP_START_METHOD)
+            )
+        return self._executor
+    
+    async def _run(self, operation: str, func, *args):
+        started = time.perf_counter()
+        try:
+            if not self.max_workers:
+                return func(*args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started, operation)
+    
+    async def hash(self, password: str) -> str:
+        """
+        Хэширование пароля
+        :param password: пароль
+        :return: хэшированный пароль
+        """
+        return await self._run("hash", _hash, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Верификация хэшированного пароля
+        :param plain_password: пароль
+        :param hashed_password: хэшированный пароль
+        :return:
+        """
+        return await self._run("verify", _verify, plain_password, hashed_password)
+    
+    def shutdown(self) -> None:
+        """
+        Остановка пула процессов
+        :return:
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,177 @@
+"""
+Простые метрики процесса в формате Prometheus: счетчики и гистограммы
+с фиксированными бакетами и метками
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Бакеты (в секундах) для времени ожидания и задержек
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными бакетами: observe выполняет бинарный поиск
+    и инкремент счетчика, поэтому ее можно вызывать на горячем пути.
+    """
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        """
+        Добавление наблюдения
+        :param value: значение
+        :return:
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Кумулятивные значения бакетов (как в Prometheus), сумма и количество наблюдений
+        :return:
+        """
+        cumulative = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def format_metric(name: str, metric_type: str, documentation: str, samples: Iterable[Sample]) -> List[str]:
+    """
+    Строки метрики в текстовом формате Prometheus
+    :param name: имя метрики
+    :param metric_type: тип (counter, gauge, histogram)
+    :param documentation: описание
+    :param samples: пары (метки, значение)
+    :return:
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+class CounterFamily:
+    """
+    Счетчик с метками
+    """
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+    
+    def render(self) -> List[str]:
+        return format_metric(
+            self.name, "counter", self.documentation,
+            ((dict(zip(self.labelnames, key)), value) for key, value in self._values.items())
+        )
+
+
+class HistogramFamily:
+    """
+    Гистограмма с метками
+    """
+    
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, ...], Histogram] = {}
+    
+    def labels(self, *labelvalues: str) -> Histogram:
+        histogram = self._histograms.get(labelvalues)
+        if histogram is None:
+            histogram = self._histograms[labelvalues] = Histogram(self.buckets)
+        return histogram
+    
+    def observe(self, value: float, *labelvalues: str) -> None:
+        self.labels(*labelvalues).observe(value)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, histogram in self._histograms.items():
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in histogram.snapshot()["buckets"].items():
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{self.name}_count{_labels(labels)} {histogram.count}")
+        return lines
+
+
+class Registry:
+    """
+    Набор метрик и коллекторов (функций, которые строят метрики в момент экспорта)
+    """
+    
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], List[str]]] = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """
+        Экспорт всех метрик в текстовом формате Prometheus
+        :return:
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(HistogramFamily(
+    "http_request_duration_seconds", "HTTP request latency by route template and status",
+    ("method", "route", "status")
+))
+RATE_LIMITED = registry.register(CounterFamily(
+    "http_rate_limited_total", "Requests rejected with RateLimitExceeded", ("route",)
+))
+CACHE_REQUESTS = registry.register(CounterFamily(
+    "fastapi_cache_requests_total", "Cached endpoint responses by result (HIT or MISS)", ("route", "result")
+))
+PASSWORD_HASH_LATENCY = registry.register(HistogramFamily(
+    "password_hash_duration_seconds", "bcrypt hash/verify latency including pool queueing",
+    ("operation",), buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0)
+))
@@ -0,0 +1,34 @@
+"""
+Кодирование и декодирование курсоров для keyset-пагинации
+"""
+import base64
+import json
+from typing import Any, List
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Кодирование значений ключа последней записи страницы в непрозрачный курсор
+    :param values: значения ключа (например, [owner_id, id])
+    :return: курсор
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Декодирование курсора в значения ключа.
+    Если курсор повреждён, бросает ValueError.
+    :param cursor: курсор
+    :param size: ожидаемое количество значений ключа
+    :return: значения ключа
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,228 @@
+"""
+Гибридное хранилище лимитера запросов: локальные счетчики процесса с пакетной синхронизацией в Redis
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import redis
+from limits.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Увеличение счетчика окна и установка TTL при его создании;
+# возвращает глобальное значение счетчика и оставшееся время окна в мс
+INCR_EXPIRE_SCRIPT = """
+local current = redis.call('incrby', KEYS[1], ARGV[1])
+if tonumber(current) == tonumber(ARGV[1]) then
+    redis.call('expire', KEYS[1], ARGV[2])
+end
+return {current, redis.call('pttl', KEYS[1])}
+"""
+
+
+class _Counter:
+    """
+    Локальное состояние счетчика окна: глобальное значение на момент последней
+    синхронизации и локальные попадания, еще не отправленные в Redis
+    """
+    __slots__ = ("synced", "pending", "expires_at")
+    
+    def __init__(self, expires_at: float):
+        self.synced = 0
+        self.pending = 0
+        self.expires_at = expires_at
+
+
+class HybridRedisStorage(Storage):
+    """
+    Хранилище limits (стратегия fixed-window) для slowapi.
+    
+    Запрос увеличивает только локальный счетчик процесса; накопленные попадания
+    отправляются в Redis одним pipeline раз в sync_interval секунд фоновым потоком,
+    а в ответ воркер получает глобальные значения счетчиков.
+    Синхронно (в потоке запроса) Redis вызывается только для первого попадания в окно
+    и когда неотправленных попаданий ключа становится max_pending.
+    Поэтому превышение глобального лимита не больше чем
+    (количество воркеров) * max(max_pending, попаданий ключа за sync_interval).
+    При недоступности Redis лимиты продолжают действовать локально.
+    
+    URI: hybrid+redis://host:port/db (hybrid+rediss://...); вместо URI можно передать
+    готовый пул соединений (connection_pool).
+    """
+    
+    STORAGE_SCHEME = ["hybrid+redis", "hybrid+rediss"]
+    PREFIX = "LIMITS"
+    
+    def __init__(
+            self,
+            uri: str,
+            connection_pool: Optional[redis.ConnectionPool] = None,
+            sync_interval: float = 0.5,
+            max_pending: int = 10,
+            wrap_exceptions: bool = False,
+            **options
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        if connection_pool is not None:
+            self.redis = redis.Redis(connection_pool=connection_pool)
+        else:
+            self.redis = redis.Redis.from_url(uri.removeprefix("hybrid+"), **options)
+        self.script = self.redis.register_script(INCR_EXPIRE_SCRIPT)
+        self.sync_interval = float(sync_interval)
+        self.max_pending = int(max_pending)
+        
+        self._counters: Dict[str, _Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # после ошибки Redis синхронные отправки откладываются до следующего интервала
+        self._retry_at = 0.0
+        
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "inline_syncs": 0,
+            "batch_syncs": 0,
+            "synced_keys": 0,
+            "sync_errors": 0,
+        }
+    
+    @property
+    def base_exceptions(self):
+        return redis.RedisError
+    
+    def _key(self, key: str) -> str:
+        return f"{self.PREFIX}:{key}"
+    
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        """
+        Локальное увеличение счетчика окна
+        :param key: ключ лимита
+        :param expiry: длительность окна, с
+        :param elastic_expiry: не поддерживается (окно не продлевается)
+        :param amount: стоимость запроса
+        :return: оценка глобального значения счетчика
+        """
+        self._ensure_thread()
+        now = time.time()
+        with self._lock:
+            self.stats["hits"] += 1
+            counter = self._counters.get(key)
+            new_window = counter is None or counter.expires_at <= now
+            if new_window:
+                counter = self._counters[key] = _Counter(now + expiry)
+            counter.pending += amount
+            sync_now = (new_window or counter.pending >= self.max_pending) and now >= self._retry_at
+        
+        if sync_now:
+            self.stats["inline_syncs"] += 1
+            self.sync([key])
+        with self._lock:
+            return counter.synced + counter.pending
+    
+    def sync(self, keys: Optional[List[str]] = None) -> None:
+        """
+        Отправка локальных попаданий в Redis одним pipeline и обновление глобальных значений.
+        При ошибке Redis попадания остаются локальными до следующей синхронизации.
+        :param keys: ключи (по умолчанию - все с неотправленными попаданиями)
+        :return:
+        """
+        now = time.time()
+        batch = []
+        with self._lock:
+            for key in list(self._counters if keys is None else keys):
+                counter = self._counters.get(key)
+                if counter is None:
+                    continue
+                if counter.expires_at <= now:
+                    del self._counters[key]
+                    continue
+                if counter.pending:
+                    batch.append((key, counter, counter.pending, max(1, int(counter.expires_at - now + 0.999))))
+                    counter.synced += counter.pending
+                    counter.pending = 0
+        if not batch:
+            return
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, _, amount, expiry in batch:
+                self.script(keys=[self._key(key)], args=[amount, expiry], client=pipe)
+            results = pipe.execute()
+        except redis.RedisError as e:
+            self.stats["sync_errors"] += 1
+            self._retry_at = time.time() + self.sync_interval
+            logger.warning("Rate limit sync failed: %s", e)
+            with self._lock:
+                for key, counter, amount, _ in batch:
+                    counter.synced -= amount
+                    counter.pending += amount
+            return
+        
+        self.stats["synced_keys"] += len(batch)
+        now = time.time()
+        with self._lock:
+            for (key, counter, amount, _), (current, ttl_ms) in zip(batch, results):
+                # значение Redis уже включает отправленные попадания и попадания других воркеров
+                counter.synced = int(current)
+                if ttl_ms > 0:
+                    counter.expires_at = now + ttl_ms / 1000
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped.clear()
+                    self._thread = threading.Thread(target=self._sync_loop, name="rate-limit-sync", daemon=True)
+                    self._thread.start()
+    
+    def _sync_loop(self) -> None:
+        while not self._stopped.wait(self.sync_interval):
+            self.stats["batch_syncs"] += 1
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Rate limit sync loop error")
+    
+    def stop(self) -> None:
+        """
+        Остановка фоновой синхронизации с отправкой оставшихся попаданий
+        :return:
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sync()
+    
+    def get(self, key: str) -> int:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter.expires_at <= time.time():
+                return 0
+            return counter.synced + counter.pending
+    
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and counter.expires_at > time.time():
+                return counter.expires_at
+        return max(self.redis.pttl(self._key(key)), 0) / 1000 + time.time()
+    
+    def check(self) -> bool:
+        try:
+            return self.redis.ping()
+        except redis.RedisError:
+            return False
+    
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            self._counters.clear()
+        keys = list(self.redis.scan_iter(match=f"{self.PREFIX}:*"))
+        return self.redis.delete(*keys) if keys else 0
+    
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+        self.redis.delete(self._key(key))
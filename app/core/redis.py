@@ -0,0 +1,154 @@
+"""
+Общие пулы соединений Redis (клиент приложения, кэш, лимитер запросов) со статистикой использования
+"""
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.metrics import Histogram
+
+# Максимальное количество команд в одном pipeline
+PIPELINE_CHUNK_SIZE = 1000
+
+
+class _PoolStats:
+    """
+    Счетчики использования пула: созданные и выданные соединения, ошибки получения соединения,
+    занятые соединения и гистограмма времени получения соединения
+    """
+    
+    def _init_stats(self) -> None:
+        self.wait_histogram = Histogram()
+        self.stats: Dict[str, int] = {"created": 0, "acquired": 0, "errors": 0}
+        self._in_use = set()
+    
+    def _acquired(self, connection, started: float) -> None:
+        self.wait_histogram.observe(time.perf_counter() - started)
+        self.stats["acquired"] += 1
+        self._in_use.add(connection)
+    
+    def _failed(self, started: float) -> None:
+        self.wait_histogram.observe(time.perf_counter() - started)
+        self.stats["errors"] += 1
+
+
+class TimedBlockingConnectionPool(_PoolStats, aioredis.BlockingConnectionPool):
+    """
+    Асинхронный BlockingConnectionPool со статистикой использования: при исчерпании
+    max_connections запрос ждет свободное соединение не дольше timeout,
+    а не открывает новое соединение
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
+    
+    def make_connection(self):
+        self.stats["created"] += 1
+        return super().make_connection()
+    
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            self._failed(started)
+            raise
+        self._acquired(connection, started)
+        return connection
+    
+    async def release(self, connection) -> None:
+        self._in_use.discard(connection)
+        await super().release(connection)
+
+
+class TimedSyncBlockingConnectionPool(_PoolStats, redis.BlockingConnectionPool):
+    """
+    Синхронный вариант TimedBlockingConnectionPool (для хранилищ limits)
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
+    
+    def make_connection(self):
+        self.stats["created"] += 1
+        return super().make_connection()
+    
+    def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            self._failed(started)
+            raise
+        self._acquired(connection, started)
+        return connection
+    
+    def release(self, connection) -> None:
+        self._in_use.discard(connection)
+        super().release(connection)
+
+
+def create_redis_pool(decode_responses: bool = False) -> TimedBlockingConnectionPool:
+    """
+    Асинхронный пул соединений Redis с параметрами из настроек
+    :param decode_responses: декодировать ответы в str
+    :return:
+    """
+    return TimedBlockingConnectionPool.from_url(
+        settings.REDIS_URL, decode_responses=decode_responses, **settings.REDIS_POOL_OPTIONS()
+    )
+
+
+def create_sync_redis_pool(decode_responses: bool = False) -> TimedSyncBlockingConnectionPool:
+    """
+    Синхронный пул соединений Redis с параметрами из настроек
+    :param decode_responses: декодировать ответы в str
+    :return:
+    """
+    return TimedSyncBlockingConnectionPool.from_url(
+        settings.REDIS_URL, decode_responses=decode_responses, **settings.REDIS_POOL_OPTIONS()
+    )
+
+
+# Пул клиента приложения и кэша (FastAPICache, поколения кэша, pub/sub инвалидации)
+redis_pool = create_redis_pool(decode_responses=True)
+# Пул лимитера запросов (limits использует синхронный клиент)
+sync_redis_pool = create_sync_redis_pool()
+
+
+def redis_pool_stats(pool: _PoolStats) -> Dict[str, object]:
+    """
+    Состояние пула соединений Redis
+    :param pool: пул соединений
+    :return: размер пула, занятые и свободные соединения, счетчики и гистограмма ожидания
+    """
+    in_use = len(pool._in_use)
+    return {
+        "size": pool.max_connections,
+        "in_use": in_use,
+        "idle": max(len(pool._connections) - in_use, 0),
+        **pool.stats,
+        "wait_seconds": pool.wait_histogram.snapshot(),
+    }
+
+
+async def execute_pipelined(client: aioredis.Redis, commands: Sequence[Tuple[Any, ...]]) -> List[Any]:
+    """
+    Выполнение команд в нетранзакционном pipeline: один round trip
+    на каждые PIPELINE_CHUNK_SIZE команд вместо round trip на команду
+    :param client: клиент Redis
+    :param commands: команды с аргументами, например ("GET", key)
+    :return: результаты команд в порядке commands
+    """
+    results = []
+    for start in range(0, len(commands), PIPELINE_CHUNK_SIZE):
+        async with client.pipeline(transaction=False) as pipe:
+            for command in commands[start:start + PIPELINE_CHUNK_SIZE]:
+                pipe.execute_command(*command)
+            results.extend(await pipe.execute())
+    return results
@@ -1,11 +1,14 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Union
+from typing import Dict, Union, Optional
 
 from fastapi import HTTPException, Response, Request
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.config import settings
+from app.core.hasher import PasswordHasher
 
 SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
@@ -14,7 +17,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 ACCESS_TOKEN_EXPIRE = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 ACCESS_TOKEN_EXPIRE_SECONDS = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES).seconds
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS)
 
 not_authorized_exception = HTTPException(
     status_code=403,
@@ -22,23 +25,99 @@ not_authorized_exception = HTTPException(
 )
 
 
-def hash_password(password):
+class TokenCache:
     """
-    Хэширование пароля
+    Ограниченный LRU-кэш декодированных JWT-токенов.
+    Ключ - SHA-256 токена, запись живет не дольше exp токена и ttl,
+    поэтому повторная проверка подписи выполняется только для новых токенов.
+    """
+    
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self.stats: Dict[str, float] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "decode_seconds": 0.0,
+        }
+    
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Получение декодированного токена из кэша
+        :param token: JWT-токен
+        :return: полезная нагрузка или None
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return payload
+    
+    def set(self, token: str, payload: dict) -> None:
+        """
+        Сохранение декодированного токена в кэш до min(exp, now + ttl)
+        :param token: JWT-токен
+        :param payload: полезная нагрузка
+        :return:
+        """
+        expires_at = time.time() + self.ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        
+        key = self._key(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    def saved_seconds(self) -> float:
+        """
+        Оценка сэкономленного CPU-времени: попадания * среднее время декодирования
+        :return:
+        """
+        if not self.stats["misses"]:
+            return 0.0
+        return self.stats["hits"] * self.stats["decode_seconds"] / self.stats["misses"]
+
+
+token_cache = TokenCache(settings.JWT_CACHE_MAX_SIZE, settings.JWT_CACHE_TTL_SECONDS)
+
+
+async def hash_password(password):
+    """
+    Хэширование пароля (в пуле процессов, не блокируя event loop)
     :param password: пароль
     :return: хэшированный пароль
     """
-    return pwd_context.hash(password)
+    return await password_hasher.hash(password)
 
 
-def verify_password(plain_password, hashed_password):
+async def verify_password(plain_password, hashed_password):
     """
-    Верификация хэшированного пароля
+    Верификация хэшированного пароля (в пуле процессов, не блокируя event loop)
     :param plain_password: пароль
     :param hashed_password: хэшированный пароль
     :return:
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 async def create_jwt_token(data: Dict[str, Union[str, int, datetime]]) -> str:
@@ -57,9 +136,17 @@ async def create_jwt_token(data: Dict[str, Union[str, int, datetime]]) -> str:
 def decode_jwt_token(token: str) -> dict:
     """
     Декодирование JWT-токена, используя SECRET_KEY и ALGORITHM.
+    Результат проверки подписи кэшируется в token_cache до истечения токена.
     :param token: JWT-токен
     """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    
+    started = time.perf_counter()
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.stats["decode_seconds"] += time.perf_counter() - started
+    token_cache.set(token, payload)
     return payload
 
 
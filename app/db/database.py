@@ -1,17 +1,39 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.config import settings
+from app.db.pool import TimedQueuePool
+from app.db.profiling import db_stats, new_stats, instrument
+from app.db.replicas import ReplicaPool, Replica, CONNECTION_ERRORS
+
+logger = logging.getLogger(__name__)
 
-# TODO: параметры engine стоит хранить в переменных среды
-engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URL(async_driver=True),
-    pool_size=10,  # максимальное количество постоянных соединений
-    max_overflow=20,  # дополнительные соединения сверх pool_size
-    pool_timeout=30,  # таймаут ожидания соединения
-    pool_recycle=1800,  # время перезагрузки соединений
-    echo=True  # логирование sql query
+# Параметры движка и пула соединений (общие для primary и реплик)
+engine_kwargs = dict(
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,  # максимальное количество постоянных соединений
+    max_overflow=settings.DB_MAX_OVERFLOW,  # дополнительные соединения сверх pool_size
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # таймаут ожидания соединения
+    pool_recycle=settings.DB_POOL_RECYCLE,  # время перезагрузки соединений
+    echo=settings.DB_ECHO,  # логирование sql query
+    connect_args={
+        # кэш подготовленных запросов SQLAlchemy и asyncpg на соединение
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
 )
 
+engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL(async_driver=True), **engine_kwargs)
+
+# Движок для чтения: транзакции открываются как BEGIN READ ONLY
+read_only_engine = engine.execution_options(postgresql_readonly=True)
+
 # Создаем фабрику асинхронных сессий
 SessionLocal = async_sessionmaker(
     bind=engine,
@@ -20,15 +42,167 @@ SessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+ReadOnlySessionLocal = async_sessionmaker(
+    bind=read_only_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False
+)
 
-# TODO: инициализировать сессию другим образом и переместить в depends.py
-async def get_async_db():
-    async with SessionLocal() as db:
+# Реплики для чтения (GET /tasks, GET /tasks/{id})
+replicas = ReplicaPool(
+    settings.POSTGRES_REPLICA_URLS,
+    balancing=settings.REPLICA_BALANCING,
+    health_check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+    **engine_kwargs
+)
+
+# Cookie с моментом, до которого чтения клиента идут на primary (read-your-writes)
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+# HTTP-методы, которые не изменяют данные и выполняются в read-only транзакции
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Профилирование SQL-запросов primary и реплик
+instrument(engine)
+for replica in replicas.replicas:
+    instrument(replica.engine)
+
+
+def on_commit(db: AsyncSession, callback: Callable[[], Awaitable[Any]]) -> None:
+    """
+    Регистрация действия, которое выполняется после успешного коммита сессии запроса
+    (например, инвалидация кэша). При откате транзакции действие не выполняется,
+    ошибка действия логируется и не меняет ответ на запрос.
+    :param db: сессия SQLAlchemy
+    :param callback: асинхронная функция без аргументов
+    :return:
+    """
+    db.info.setdefault("on_commit", []).append(callback)
+
+
+@asynccontextmanager
+async def request_session(request: Request, session_factory: async_sessionmaker, read_only: bool):
+    """
+    Сессия SQLAlchemy на время HTTP-запроса (unit of work).
+    Репозитории только выполняют flush, а коммит выполняется один раз в конце запроса.
+    Read-only сессии не коммитятся.
+    :param request: HTTP-запрос
+    :param session_factory: фабрика сессий
+    :param read_only: признак запроса на чтение
+    """
+    stats = db_stats.get()
+    if stats is None:
+        stats = new_stats()
+        db_stats.set(stats)
+    request.state.db_stats = stats
+    
+    async with session_factory() as db:
         try:
             yield db
-            await db.commit()
+            if not read_only:
+                await db.commit()
         except Exception as e:
             await db.rollback()
             raise e
         finally:
             await db.close()
+            logger.debug(
+                "%s %s: queries=%d commits=%d db_time=%.1fms",
+                request.method, request.url.path, stats["queries"], stats["commits"], stats["db_time"] * 1000
+            )
+        
+        # Действия после коммита выполняются вне транзакции: изменения уже сохранены,
+        # поэтому ошибка действия (например, недоступность Redis при инвалидации кэша)
+        # только логируется и не прерывает остальные действия и ответ клиенту
+        for callback in db.info.pop("on_commit", []):
+            try:
+                await callback()
+            except Exception:
+                logger.exception("on_commit callback failed for %s %s", request.method, request.url.path)
+
+
+# TODO: инициализировать сессию другим образом и переместить в depends.py
+async def get_async_db(request: Request, response: Response):
+    """
+    Сессия primary для HTTP-запроса.
+    Запросы на чтение выполняются в read-only транзакции и не коммитятся.
+    После запросов на изменение чтения клиента READ_YOUR_WRITES_SECONDS секунд
+    направляются на primary, чтобы не читать с отстающей реплики.
+    :param request: HTTP-запрос
+    :param response: HTTP-ответ
+    """
+    read_only = request.method in READ_ONLY_METHODS
+    if not read_only and replicas.replicas:
+        primary_until = int(time.time()) + settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(primary_until),
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    
+    session_factory = ReadOnlySessionLocal if read_only else SessionLocal
+    async with request_session(request, session_factory, read_only) as db:
+        yield db
+
+
+def choose_read_replica(request: Request) -> Optional[Replica]:
+    """
+    Выбор реплики для чтения: None, если реплик нет, все они недоступны
+    или клиент недавно изменял данные (тогда чтение идет на primary).
+    :param request: HTTP-запрос
+    :return:
+    """
+    primary_until = request.cookies.get(PRIMARY_UNTIL_COOKIE, "")
+    recent_write = primary_until.isdigit() and int(primary_until) > time.time()
+    return None if recent_write else replicas.choose()
+
+
+async def get_read_db(request: Request):
+    """
+    Read-only сессия для запросов на чтение: реплика, выбранная балансировщиком,
+    или primary (см. choose_read_replica).
+    Соединение с репликой устанавливается до эндпоинта: если реплика недоступна,
+    она исключается из балансировки, а запрос выполняется на primary.
+    :param request: HTTP-запрос
+    """
+    replica = choose_read_replica(request)
+    if replica is not None:
+        session = replica.session_factory()
+        try:
+            await session.connection()
+        except (DBAPIError, *CONNECTION_ERRORS) as e:
+            replicas.mark_unhealthy(replica, e)
+            await session.close()
+            replica = None
+    
+    if replica is None:
+        async with request_session(request, ReadOnlySessionLocal, read_only=True) as db:
+            yield db
+        return
+    
+    try:
+        # сессия с уже установленным соединением
+        async with request_session(request, lambda: session, read_only=True) as db:
+            yield db
+    except Exception as e:
+        # эндпоинты оборачивают ошибки в HTTPException, поэтому ищем ошибку соединения в цепочке
+        error = e
+        while error is not None and not isinstance(error, CONNECTION_ERRORS):
+            error = error.__cause__ or error.__context__
+        if error is not None:
+            replicas.mark_unhealthy(replica, error)
+        raise e
+
+
+def get_read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Фабрика read-only сессий для ответов, которые читают БД после завершения эндпоинта
+    (например, StreamingResponse): сессия зависимости к этому моменту уже закрыта.
+    :param request: HTTP-запрос
+    :return:
+    """
+    replica = choose_read_replica(request)
+    return replica.session_factory if replica is not None else ReadOnlySessionLocal
@@ -0,0 +1,46 @@
+"""
+Пул соединений с измерением времени ожидания соединения
+"""
+import time
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Histogram
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который записывает время получения соединения
+    из пула (включая ожидание свободного соединения) в гистограмму.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = Histogram()
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - started)
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, object]:
+    """
+    Состояние пула соединений движка
+    :param engine: асинхронный движок SQLAlchemy
+    :return: размер пула, занятые, свободные и overflow-соединения, гистограмма ожидания
+    """
+    pool = engine.sync_engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, TimedQueuePool):
+        stats["wait_seconds"] = pool.wait_histogram.snapshot()
+    return stats
@@ -0,0 +1,118 @@
+"""
+Профилирование SQL-запросов в рамках HTTP-запроса: количество запросов,
+суммарное время в БД, журнал медленных запросов и обнаружение N+1
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Статистика БД текущего HTTP-запроса
+db_stats: ContextVar[Optional[Dict[str, Any]]] = ContextVar("db_stats", default=None)
+
+
+def new_stats() -> Dict[str, Any]:
+    """
+    Пустая статистика БД для HTTP-запроса
+    :return:
+    """
+    return {"queries": 0, "commits": 0, "db_time": 0.0, "statements": Counter()}
+
+
+def server_timing(stats: Dict[str, Any], total: float) -> str:
+    """
+    Значение заголовка Server-Timing
+    :param stats: статистика БД запроса
+    :param total: полное время обработки запроса, с
+    :return:
+    """
+    return (
+        f'db;dur={stats["db_time"] * 1000:.2f};desc="{stats["queries"]} queries, {stats["commits"]} commits", '
+        f'app;dur={total * 1000:.2f}'
+    )
+
+
+# Время начала запроса хранится в контексте выполнения: контекст создается на каждое выполнение,
+# поэтому запрос, завершившийся ошибкой (after_cursor_execute не вызывается), ничего не оставляет
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    if elapsed >= settings.SLOW_QUERY_SECONDS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+    
+    stats = db_stats.get()
+    if stats is None:
+        return
+    stats["queries"] += 1
+    stats["db_time"] += elapsed
+    
+    # Запросы одной формы отличаются только параметрами, поэтому текст SQL и есть «форма»
+    statements = stats["statements"]
+    statements[statement] += 1
+    if statements[statement] == settings.N_PLUS_ONE_THRESHOLD + 1:
+        logger.warning(
+            "Possible N+1: statement executed more than %d times in one request: %s",
+            settings.N_PLUS_ONE_THRESHOLD, statement
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session):
+    stats = db_stats.get()
+    if stats is not None:
+        stats["commits"] += 1
+
+
+def instrument(engine: AsyncEngine) -> None:
+    """
+    Подключение профилирования к движку
+    :param engine: асинхронный движок SQLAlchemy
+    :return:
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class DBProfilingMiddleware:
+    """
+    ASGI middleware, которое собирает статистику SQL-запросов HTTP-запроса
+    и добавляет к ответу заголовок Server-Timing. Заголовок вычисляется при отправке
+    начала ответа, поэтому потоковые ответы (SSE) не буферизуются и не задерживаются
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        stats = new_stats()
+        
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - started))
+            await send(message)
+        
+        token = db_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            db_stats.reset(token)
@@ -0,0 +1,130 @@
+"""
+Маршрутизация запросов на чтение к репликам PostgreSQL
+"""
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, после которых реплика считается недоступной
+CONNECTION_ERRORS = (OperationalError, OSError, asyncio.TimeoutError)
+
+
+class Replica:
+    """
+    Реплика PostgreSQL: движок, фабрика read-only сессий и состояние доступности
+    """
+    
+    def __init__(self, url: str, **engine_kwargs):
+        self.url = url
+        # pre_ping: соединение пула, разорванное остановкой реплики, обнаруживается при выдаче,
+        # до первого запроса эндпоинта (см. get_read_db)
+        self.engine: AsyncEngine = create_async_engine(url, pool_pre_ping=True, **engine_kwargs).execution_options(
+            postgresql_readonly=True
+        )
+        self.session_factory = async_sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autocommit=False,
+            autoflush=False
+        )
+        self.healthy = True
+    
+    @property
+    def checked_out(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+
+class ReplicaPool:
+    """
+    Набор реплик с балансировкой round_robin или least_connections.
+    Недоступные реплики исключаются до следующей успешной проверки здоровья;
+    если доступных реплик нет, choose возвращает None и чтение идет на primary.
+    """
+    
+    def __init__(self, urls: List[str], balancing: str, health_check_interval: int, **engine_kwargs):
+        if balancing not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica balancing strategy: {balancing}")
+        self.replicas = [Replica(url, **engine_kwargs) for url in urls]
+        self.balancing = balancing
+        self.health_check_interval = health_check_interval
+        self._counter = itertools.count()
+        self._health_checker: Optional[asyncio.Task] = None
+    
+    def choose(self) -> Optional[Replica]:
+        """
+        Выбор реплики для чтения
+        :return: реплика или None, если доступных реплик нет
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.balancing == "least_connections":
+            return min(healthy, key=lambda replica: replica.checked_out)
+        return healthy[next(self._counter) % len(healthy)]
+    
+    def mark_unhealthy(self, replica: Replica, error: Exception) -> None:
+        """
+        Исключение реплики из балансировки до следующей успешной проверки
+        :param replica: реплика
+        :param error: ошибка соединения
+        :return:
+        """
+        if replica.healthy:
+            logger.warning("Replica %s is unhealthy, reads fall back: %s", replica.engine.url, error)
+        replica.healthy = False
+    
+    @staticmethod
+    async def _ping(replica: Replica) -> None:
+        async with replica.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    async def check(self, replica: Replica) -> None:
+        """
+        Проверка доступности реплики запросом SELECT 1.
+        Таймаут ограничивает и установку соединения: недоступный хост не отвечает на connect
+        :param replica: реплика
+        :return:
+        """
+        try:
+            await asyncio.wait_for(self._ping(replica), timeout=self.health_check_interval)
+        except (DBAPIError, *CONNECTION_ERRORS) as e:
+            self.mark_unhealthy(replica, e)
+        else:
+            if not replica.healthy:
+                logger.info("Replica %s is healthy again", replica.engine.url)
+            replica.healthy = True
+    
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.health_check_interval)
+    
+    def start(self) -> None:
+        """
+        Запуск периодической проверки здоровья реплик
+        :return:
+        """
+        if self.replicas and self._health_checker is None:
+            self._health_checker = asyncio.create_task(self._check_loop())
+    
+    async def stop(self) -> None:
+        """
+        Остановка проверки здоровья и закрытие соединений с репликами
+        :return:
+        """
+        if self._health_checker is not None:
+            self._health_checker.cancel()
+            try:
+                await self._health_checker
+            except asyncio.CancelledError:
+                pass
+            self._health_checker = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -2,14 +2,18 @@
 Файл внедрения зависимостей
 """
 from app.services.TaskService import TaskService
+from app.services.TaskStatsService import TaskStatsService
 from app.services.UserService import UserService
 import redis.asyncio as aioredis
-from app.config import settings
+from app.core.events import TaskEventHub, task_events
+from app.core.redis import redis_pool
 
-redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+# клиент приложения и кэша использует общий пул соединений (см. app/core/redis.py)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
 
 user_service = UserService()
 task_service = TaskService()
+task_stats_service = TaskStatsService()
 
 
 async def get_user_service() -> UserService:
@@ -19,5 +23,13 @@ async def get_user_service() -> UserService:
 async def get_task_service() -> TaskService:
     return task_service
 
+
+async def get_task_stats_service() -> TaskStatsService:
+    return task_stats_service
+
 async def get_redis_client() -> aioredis.Redis:
-    return redis_client
\ No newline at end of file
+    return redis_client
+
+
+async def get_task_event_hub() -> TaskEventHub:
+    return task_events
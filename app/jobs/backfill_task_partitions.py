@@ -0,0 +1,107 @@
+"""
+Перенос существующих задач в секционированную таблицу tasks_partitioned (миграция 0007)
+без блокировки таблицы tasks. Задачи копируются пачками по TASK_PARTITION_BACKFILL_BATCH_SIZE
+в порядке ID, каждая пачка - в отдельной короткой транзакции с паузой
+TASK_PARTITION_BACKFILL_PAUSE_SECONDS между пачками. Прогресс сохраняется в таблице
+tasks_partition_backfill, поэтому прерванный перенос продолжается с последней пачки.
+После завершения переноса таблицы меняются местами миграцией 0008.
+
+Запуск:
+    python -m app.jobs.backfill_task_partitions
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Строки пачки блокируются FOR SHARE: изменение задачи в параллельной транзакции либо
+# завершается до копирования (и копируется новая версия строки), либо ждет коммита пачки
+# (и триггер миграции 0007 перезаписывает скопированную строку). Задачи, уже перенесенные
+# триггером, пропускаются (ON CONFLICT DO NOTHING)
+COPY_BATCH = text("""
+WITH batch AS (
+    SELECT id, title, description, is_completed, owner_id, version
+    FROM tasks
+    WHERE id > :after_id AND id <= :until_id
+    ORDER BY id
+    LIMIT :limit
+    FOR SHARE
+), copied AS (
+    INSERT INTO tasks_partitioned (id, title, description, is_completed, owner_id, version)
+    SELECT id, title, description, is_completed, owner_id, version
+    FROM batch WHERE owner_id IS NOT NULL
+    ON CONFLICT (owner_id, id) DO NOTHING
+    RETURNING 1
+)
+SELECT
+    max(id) AS last_id,
+    count(*) FILTER (WHERE owner_id IS NULL) AS skipped,
+    (SELECT count(*) FROM copied) AS copied
+FROM batch
+""")
+
+
+async def backfill_task_partitions(
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Копирование задач в секционированную таблицу.
+    Копируются задачи с ID не больше максимального на момент запуска:
+    новые задачи переносит триггер миграции 0007.
+    :param batch_size: размер пачки задач
+    :param pause: пауза между пачками, с
+    :return: количество скопированных задач и пропущенных задач без владельца
+    """
+    batch_size = batch_size or settings.TASK_PARTITION_BACKFILL_BATCH_SIZE
+    pause = settings.TASK_PARTITION_BACKFILL_PAUSE_SECONDS if pause is None else pause
+    async with SessionLocal() as db:
+        state = (await db.execute(text("SELECT last_id, completed_at FROM tasks_partition_backfill"))).one()
+        until_id = (await db.execute(text("SELECT coalesce(max(id), 0) FROM tasks"))).scalar_one()
+    if state.completed_at is not None:
+        return {"copied": 0, "skipped": 0}
+    
+    copied, skipped = 0, 0
+    after_id = state.last_id
+    while after_id < until_id:
+        async with SessionLocal() as db:
+            batch = (await db.execute(
+                COPY_BATCH, {"after_id": after_id, "until_id": until_id, "limit": batch_size}
+            )).one()
+            # строки пачки могли быть удалены параллельно - тогда продолжаем с первой оставшейся задачи
+            last_id = batch.last_id
+            if last_id is None:
+                last_id = (await db.execute(
+                    text("SELECT min(id) - 1 FROM tasks WHERE id > :after_id AND id <= :until_id"),
+                    {"after_id": after_id, "until_id": until_id}
+                )).scalar_one()
+                if last_id is None:
+                    last_id = until_id
+            await db.execute(
+                text("UPDATE tasks_partition_backfill SET last_id = :last_id"), {"last_id": last_id}
+            )
+            await db.commit()
+        copied += batch.copied
+        skipped += batch.skipped
+        after_id = last_id
+        logger.info("Task partitions backfill: copied up to id %s of %s", after_id, until_id)
+        if pause:
+            await asyncio.sleep(pause)
+    
+    async with SessionLocal() as db:
+        await db.execute(text("UPDATE tasks_partition_backfill SET completed_at = now()"))
+        await db.commit()
+    if skipped:
+        logger.warning("Task partitions backfill skipped %d tasks without owner", skipped)
+    return {"copied": copied, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(backfill_task_partitions()))
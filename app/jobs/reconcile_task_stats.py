@@ -0,0 +1,45 @@
+"""
+Сверка счетчиков задач (task_stats) с таблицей tasks и исправление расхождений.
+Пользователи обрабатываются пачками по TASK_STATS_RECONCILE_BATCH_SIZE,
+каждая пачка - в отдельной короткой транзакции.
+
+Запуск (например, по расписанию cron):
+    python -m app.jobs.reconcile_task_stats
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.depends import task_stats_service
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_task_stats(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Сверка счетчиков задач всех пользователей
+    :param batch_size: размер пачки пользователей
+    :return: количество проверенных пользователей и исправленных счетчиков
+    """
+    batch_size = batch_size or settings.TASK_STATS_RECONCILE_BATCH_SIZE
+    checked, repaired = 0, 0
+    after_user_id = 0
+    while True:
+        async with SessionLocal() as db:
+            user_ids, repaired_ids = await task_stats_service.reconcile(db, after_user_id, batch_size)
+            await db.commit()
+        if not user_ids:
+            break
+        if repaired_ids:
+            logger.warning("Task stats drift repaired for users %s", repaired_ids)
+        checked += len(user_ids)
+        repaired += len(repaired_ids)
+        after_user_id = user_ids[-1]
+    return {"checked": checked, "repaired": repaired}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(reconcile_task_stats()))
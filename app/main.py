@@ -1,29 +1,76 @@
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+from app.api.etag import ETagMiddleware
 from app.api.limiter import limiter
-from app.api.routers import users, tasks
+from app.api.metrics import MetricsMiddleware
+from app.api.routers import users, tasks, internal, metrics
+from app.config import settings
+from app.core.cache import TwoTierBackend
+from app.core.events import task_events
+from app.core.rate_limit import HybridRedisStorage
+from app.core.security import password_hasher
+from app.db.database import replicas
+from app.db.profiling import DBProfilingMiddleware
 from app.depends import get_redis_client
 
 app = FastAPI()
 
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(ETagMiddleware)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
+app.add_middleware(DBProfilingMiddleware)
+
+# внешний слой: учитывает в том числе запросы, отклоненные лимитером
+app.add_middleware(MetricsMiddleware)
+
+
 @app.on_event("startup")
 async def startup():
-    # инициализируем кэш
-    FastAPICache.init(RedisBackend(get_redis_client()), prefix="fastapi-cache")
+    # инициализируем кэш: локальный LRU-кэш воркера перед Redis
+    backend = TwoTierBackend(
+        await get_redis_client(),
+        channel=settings.CACHE_INVALIDATION_CHANNEL,
+        max_items=settings.CACHE_LOCAL_MAX_ITEMS,
+        max_bytes=settings.CACHE_LOCAL_MAX_BYTES,
+        local_ttl=settings.CACHE_LOCAL_TTL_SECONDS,
+        single_flight=settings.CACHE_SINGLE_FLIGHT,
+        lock_timeout=settings.CACHE_LOCK_SECONDS,
+        stale_ttl=settings.CACHE_STALE_SECONDS
+    )
+    backend.start()
+    FastAPICache.init(backend, prefix="fastapi-cache")
+    
+    # проверка здоровья реплик для чтения
+    replicas.start()
+    
+    # рассылка событий потока изменений задач соединениям воркера
+    task_events.start()
     
     app.include_router(users.router)
     app.include_router(tasks.router)
+    if settings.INTERNAL_ENDPOINTS_ENABLED:
+        app.include_router(internal.router)
+        app.include_router(metrics.router)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    backend = FastAPICache.get_backend()
+    if isinstance(backend, TwoTierBackend):
+        await backend.stop()
+    password_hasher.shutdown()
+    await replicas.stop()
+    await task_events.stop()
+    if isinstance(limiter.limiter.storage, HybridRedisStorage):
+        limiter.limiter.storage.stop()
 
 
 @app.get("/")
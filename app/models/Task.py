@@ -1,16 +1,61 @@
-from sqlalchemy import Integer, String, ForeignKey, Boolean
+from sqlalchemy import (
+    Integer, BigInteger, String, ForeignKey, Boolean, Index, Computed, FetchedValue, PrimaryKeyConstraint, text
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.models.Base import Base
 
+# Конфигурация полнотекстового поиска: без стемминга и стоп-слов,
+# поэтому одинаково работает для задач на любом языке
+SEARCH_CONFIG = 'simple'
+# Количество хэш-секций таблицы tasks (миграция 0007)
+TASKS_PARTITIONS = 16
+
 
 class Task(Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Таблица секционирована хэшем owner_id (миграции 0007, 0008): запросы с фильтром
+        # по owner_id читают одну секцию. Ключ секционирования входит в первичный ключ,
+        # который заодно обслуживает keyset-пагинацию списка задач пользователя по (owner_id, id)
+        PrimaryKeyConstraint('owner_id', 'id', name='tasks_pkey'),
+        # полнотекстовый поиск по названию и описанию
+        Index('ix_tasks_search_vector', 'search_vector', postgresql_using='gin'),
+        {
+            'postgresql_partition_by': 'HASH (owner_id)',
+            'info': {'partition_key': 'owner_id'},
+        },
+    )
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    title: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    # ID задачи уникален глобально (последовательность tasks_id_seq)
+    id: Mapped[int] = mapped_column(Integer, autoincrement=True)
+    title: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
     is_completed: Mapped[bool] = mapped_column(Boolean, default=False)
     
-    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'))
+    # Версия строки (ETag задачи): задается последовательностью tasks_version_seq
+    # при вставке и триггером при каждом изменении строки (миграция 0006)
+    version: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text("nextval('tasks_version_seq')"),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
+    
+    # Вычисляемая колонка для полнотекстового поиска, обновляется PostgreSQL при записи
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', title || ' ' || coalesce(description, ''))", persisted=True),
+        deferred=True
+    )
+    
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     owner = relationship("User", back_populates="tasks")
+
+
+# Фильтрация и сортировка списка задач пользователя (см. TaskRepository.get_page_sorted).
+# Название сравнивается побайтно (COLLATE "C"), поэтому индекс подходит и для сортировки,
+# и для поиска по префиксу
+Index('ix_tasks_owner_id_is_completed_id', Task.owner_id, Task.is_completed, Task.id)
+Index('ix_tasks_owner_id_title_id', Task.owner_id, Task.title.collate('C'), Task.id)
@@ -0,0 +1,19 @@
+from sqlalchemy import Integer, BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.Base import Base
+
+
+class TaskStats(Base):
+    """
+    Счетчики задач пользователя. Обновляются триггерами таблицы tasks
+    в той же транзакции, что и изменение задач (миграция 0005).
+    version - версия списка задач пользователя (ETag), меняется при любом
+    изменении его задач (миграция 0006).
+    """
+    __tablename__ = 'task_stats'
+    
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0')
+    completed: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0')
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0')
@@ -1,3 +1,4 @@
 from .Task import *
 from .User import *
+from .TaskStats import *
 from .Base import *
@@ -1,6 +1,8 @@
-from typing import Type, TypeVar, Dict, Any, Generic, List, Union
+from typing import Type, TypeVar, Dict, Any, Generic, List, Union, Optional, Sequence, AsyncIterator, Iterable
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, values, column, bindparam, any_, cast
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
 from app.models.Base import Base
 
 T = TypeVar('T', bound=Base)
@@ -8,11 +10,29 @@ T = TypeVar('T', bound=Base)
 
 class BaseRepository(Generic[T]):
     """
-    Базовый асинхронный репозиторий
+    Базовый асинхронный репозиторий.
+    Методы изменения данных выполняют только flush, коммит транзакции
+    выполняется владельцем сессии (см. app.db.database.get_async_db).
+    
+    Для секционированных таблиц (ключ секционирования задан в info таблицы модели,
+    см. app.models.Task) фильтр запросов обязан содержать ключ секционирования:
+    тогда PostgreSQL читает только одну секцию (partition pruning), а не все.
     """
     
     def __init__(self, model: Type[T]):
         self.model = model
+        self.partition_key: Optional[str] = model.__table__.info.get("partition_key")
+    
+    def _check_partition_key(self, filters: Dict[str, Any]) -> None:
+        """
+        Проверка, что фильтр запроса к секционированной таблице содержит ключ секционирования
+        :param filters: значения полей (фильтр)
+        :return:
+        """
+        if self.partition_key is not None and filters.get(self.partition_key) is None:
+            raise ValueError(
+                f"Query on partitioned table {self.model.__tablename__} must filter by {self.partition_key}"
+            )
     
     async def create(self, db: AsyncSession, data: Dict[str, Any]) -> T:
         """
@@ -23,8 +43,7 @@ class BaseRepository(Generic[T]):
         """
         db_obj = self.model(**data)
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
     
     async def get(self, db: AsyncSession, filters: Dict[str, Any]) -> T:
@@ -38,6 +57,7 @@ class BaseRepository(Generic[T]):
         :param filters: значения полей (фильтр)
         :return:
         """
+        self._check_partition_key(filters)
         query = select(self.model)
         for key, value in filters.items():
             query = query.filter(getattr(self.model, key) == value)
@@ -59,8 +79,7 @@ class BaseRepository(Generic[T]):
         for key, value in update_data.items():
             setattr(db_obj, key, value)
         
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
     
     async def delete(self, db: AsyncSession, filters: Dict[str, Any]) -> Union[T, None]:
@@ -75,9 +94,9 @@ class BaseRepository(Generic[T]):
             return None
         
         await db.delete(db_obj)
-        await db.commit()
+        await db.flush()
         return db_obj
-        
+    
     async def get_all(self, db: AsyncSession, filters: Dict[str, Any]) -> List[T]:
         """
         Получение всех записей в таблице с определенными значениями.
@@ -85,9 +104,206 @@ class BaseRepository(Generic[T]):
         :param filters: значения полей (фильтр)
         :return:
         """
+        self._check_partition_key(filters)
         query = select(self.model)
         for key, value in filters.items():
             query = query.filter(getattr(self.model, key) == value)
         result = await db.execute(query)
         tasks = result.scalars().all()
         return list(tasks)
+    
+    async def stream(
+            self,
+            db: AsyncSession,
+            filters: Dict[str, Any],
+            keys: Sequence[str] = ("id",),
+            batch_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Потоковое чтение записей с определенными значениями через серверный курсор.
+        Записи читаются пачками по batch_size строк без загрузки ORM-объектов,
+        поэтому расход памяти не зависит от количества записей.
+        :param db: сессия SQLAlchemy
+        :param filters: значения полей (фильтр)
+        :param keys: поля, по которым упорядочиваются записи
+        :param batch_size: размер пачки строк
+        :return: асинхронный итератор пачек строк
+        """
+        self._check_partition_key(filters)
+        table = self.model.__table__
+        query = select(*self._columns())
+        for key, value in filters.items():
+            query = query.where(table.c[key] == value)
+        query = query.order_by(*(table.c[key] for key in keys)).execution_options(yield_per=batch_size)
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+    
+    def _columns(self) -> List[Any]:
+        """
+        Колонки таблицы для Core-запросов (SELECT, RETURNING) без вычисляемых колонок
+        (например, tsvector полнотекстового поиска), которые не нужны в ответах.
+        :return:
+        """
+        return [c for c in self.model.__table__.c if c.computed is None]
+    
+    def _from_row(self, row: Row) -> T:
+        """
+        Построение экземпляра модели из строки результата (например, RETURNING)
+        без загрузки ORM-объекта через сессию.
+        :param row: строка результата
+        :return:
+        """
+        return self.model(**row._mapping)
+    
+    async def update_returning(
+            self,
+            db: AsyncSession,
+            filters: Dict[str, Any],
+            update_data: Dict[str, Any]
+    ) -> Union[T, None]:
+        """
+        Обновление записи одним запросом UPDATE ... WHERE <filters> RETURNING *
+        без предварительной загрузки ORM-объекта.
+        
+        Внимание!
+        Обновляются все записи, подходящие под фильтр, возвращается первая.
+        :param db: сессия SQLAlchemy
+        :param filters: значения полей (фильтр)
+        :param update_data: новые значения полей
+        :return: обновленная запись или None, если запись не найдена
+        """
+        if not update_data:
+            return await self.get(db, filters)
+        
+        self._check_partition_key(filters)
+        table = self.model.__table__
+        query = update(table).values(update_data)
+        for key, value in filters.items():
+            query = query.where(table.c[key] == value)
+        result = await db.execute(query.returning(*self._columns()))
+        row = result.first()
+        return self._from_row(row) if row else None
+    
+    async def delete_returning(self, db: AsyncSession, filters: Dict[str, Any]) -> Union[T, None]:
+        """
+        Удаление записи одним запросом DELETE ... WHERE <filters> RETURNING *
+        без предварительной загрузки ORM-объекта.
+        
+        Внимание!
+        Удаляются все записи, подходящие под фильтр, возвращается первая.
+        :param db: сессия SQLAlchemy
+        :param filters: значения полей (фильтр)
+        :return: удаленная запись или None, если запись не найдена
+        """
+        self._check_partition_key(filters)
+        table = self.model.__table__
+        query = delete(table)
+        for key, value in filters.items():
+            query = query.where(table.c[key] == value)
+        result = await db.execute(query.returning(*self._columns()))
+        row = result.first()
+        return self._from_row(row) if row else None
+    
+    async def create_many(self, db: AsyncSession, data: List[Dict[str, Any]]) -> List[T]:
+        """
+        Создание нескольких записей одним запросом INSERT ... RETURNING.
+        :param db: сессия SQLAlchemy
+        :param data: список значений полей
+        :return: созданные записи в порядке data
+        """
+        if not data:
+            return []
+        table = self.model.__table__
+        query = insert(table).returning(*self._columns(), sort_by_parameter_order=True)
+        result = await db.execute(query, data)
+        return [self._from_row(row) for row in result]
+    
+    async def copy_records(self, db: AsyncSession, columns: Sequence[str], records: Iterable[tuple]) -> int:
+        """
+        Загрузка записей протоколом COPY (asyncpg copy_records_to_table) в транзакции сессии.
+        В отличие от INSERT, записи не возвращаются и ORM-объекты не создаются.
+        :param db: сессия SQLAlchemy
+        :param columns: поля таблицы в порядке значений записей
+        :param records: значения полей записей
+        :return: количество загруженных записей
+        """
+        records = list(records)
+        if not records:
+            return 0
+        table = self.model.__table__
+        conn = await db.connection()
+        # asyncpg-адаптер SQLAlchemy открывает транзакцию лениво при первом запросе,
+        # а COPY выполняется напрямую через драйвер и должен попасть в эту транзакцию
+        await conn.exec_driver_sql("SELECT 1")
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name, records=records, columns=list(columns), schema_name=table.schema
+        )
+        return len(records)
+    
+    async def update_many(
+            self,
+            db: AsyncSession,
+            filters: Dict[str, Any],
+            update_data: List[Dict[str, Any]],
+            key: str = "id"
+    ) -> List[T]:
+        """
+        Обновление нескольких записей запросами UPDATE ... FROM (VALUES ...) RETURNING.
+        Записи с одинаковым набором обновляемых полей обновляются одним запросом.
+        :param db: сессия SQLAlchemy
+        :param filters: значения полей (фильтр), общие для всех записей
+        :param update_data: список новых значений полей, каждый элемент содержит поле key
+        :param key: поле, по которому сопоставляются записи
+        :return: обновленные записи (не найденные записи отсутствуют)
+        """
+        self._check_partition_key(filters)
+        table = self.model.__table__
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for item in update_data:
+            groups.setdefault(tuple(sorted(item)), []).append(item)
+        
+        objs = []
+        for fields, items in groups.items():
+            source = values(
+                *(column(name, table.c[name].type) for name in fields),
+                name="data"
+            ).data([tuple(item[name] for name in fields) for item in items])
+            query = update(table).where(table.c[key] == source.c[key])
+            for k, value in filters.items():
+                query = query.where(table.c[k] == value)
+            # Явное приведение типов: VALUES из одних NULL Postgres считает текстом
+            query = query.values(
+                {name: cast(source.c[name], table.c[name].type) for name in fields if name != key}
+            ).returning(*self._columns())
+            result = await db.execute(query)
+            objs.extend(self._from_row(row) for row in result)
+        return objs
+    
+    async def delete_many(
+            self,
+            db: AsyncSession,
+            filters: Dict[str, Any],
+            keys: List[Any],
+            key: str = "id"
+    ) -> List[Any]:
+        """
+        Удаление нескольких записей запросом DELETE ... WHERE key = ANY(...) RETURNING key.
+        :param db: сессия SQLAlchemy
+        :param filters: значения полей (фильтр), общие для всех записей
+        :param keys: значения поля key удаляемых записей
+        :param key: поле, по которому выбираются записи
+        :return: значения поля key удаленных записей
+        """
+        self._check_partition_key(filters)
+        if not keys:
+            return []
+        table = self.model.__table__
+        query = delete(table).where(
+            table.c[key] == any_(bindparam("keys", keys, type_=ARRAY(table.c[key].type)))
+        )
+        for k, value in filters.items():
+            query = query.where(table.c[k] == value)
+        result = await db.execute(query.returning(table.c[key]))
+        return list(result.scalars().all())
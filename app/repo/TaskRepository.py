@@ -1,7 +1,138 @@
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import select, func, cast, literal, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.models import Task
+from app.models.Task import SEARCH_CONFIG
 from app.repo.BaseRepository import BaseRepository
 
 
+# Ключи сортировки списка задач пользователя (после owner_id). Название сравнивается
+# побайтно (COLLATE "C"), как в индексе ix_tasks_owner_id_title_id
+SORT_KEYS = {
+    "id": (Task.id,),
+    "title": (Task.title.collate("C"), Task.id),
+}
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Наименьшая строка, большая всех строк с префиксом prefix при побайтном сравнении.
+    Поиск по префиксу выполняется как диапазон [prefix, upper), который, в отличие
+    от LIKE с параметром, использует индекс и в generic-планах подготовленных запросов.
+    :param prefix: префикс
+    :return: верхняя граница диапазона (None, если ее нет)
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last == 0xD7FF:
+            # суррогаты не кодируются в UTF-8: следующий символ после U+D7FF - U+E000
+            return prefix[:-1] + "\ue000"
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
 class TaskRepository(BaseRepository[Task]):
     def __init__(self) -> None:
         super().__init__(Task)
+    
+    async def get_version(self, db: AsyncSession, task_id: int, owner_id: int) -> Optional[int]:
+        """
+        Версия строки задачи пользователя без загрузки задачи.
+        :param db: сессия SQLAlchemy
+        :param task_id: ID задачи
+        :param owner_id: ID пользователя
+        :return: версия или None, если задача не найдена
+        """
+        result = await db.execute(select(Task.version).where(Task.id == task_id, Task.owner_id == owner_id))
+        return result.scalar_one_or_none()
+    
+    async def get_page_sorted(
+            self,
+            db: AsyncSession,
+            owner_id: int,
+            limit: int,
+            sort: str = "id",
+            descending: bool = False,
+            after: Optional[Sequence[Any]] = None,
+            is_completed: Optional[bool] = None,
+            title_prefix: Optional[str] = None,
+            columns: Optional[Sequence[str]] = None
+    ) -> Union[List[Task], List[Row]]:
+        """
+        Получение страницы задач пользователя с фильтрами и сортировкой (keyset-пагинация).
+        Запросы обслуживаются первичным ключом (owner_id, id), индексами ix_tasks_owner_id_is_completed_id
+        и ix_tasks_owner_id_title_id.
+        :param db: сессия SQLAlchemy
+        :param owner_id: ID пользователя
+        :param limit: максимальное количество задач
+        :param sort: ключ сортировки (см. SORT_KEYS)
+        :param descending: сортировка по убыванию
+        :param after: значения ключа сортировки последней задачи предыдущей страницы
+        :param is_completed: фильтр по статусу выполнения
+        :param title_prefix: фильтр по префиксу названия (с учетом регистра)
+        :param columns: поля задачи; если заданы, возвращаются строки только с этими полями
+            вместо ORM-объектов
+        :return:
+        """
+        keys = SORT_KEYS[sort]
+        if columns is None:
+            query = select(Task)
+        else:
+            query = select(*(getattr(Task, name) for name in columns))
+        query = query.where(Task.owner_id == owner_id)
+        if is_completed is not None:
+            query = query.where(Task.is_completed == is_completed)
+        if title_prefix:
+            title = Task.title.collate("C")
+            query = query.where(title >= title_prefix)
+            upper = prefix_upper_bound(title_prefix)
+            if upper is not None:
+                query = query.where(title < upper)
+        if after is not None:
+            if descending:
+                query = query.where(tuple_(*keys) < tuple_(*after))
+            else:
+                query = query.where(tuple_(*keys) > tuple_(*after))
+        query = query.order_by(*(key.desc() if descending else key for key in keys)).limit(limit)
+        result = await db.execute(query)
+        if columns is not None:
+            return list(result.all())
+        return list(result.scalars().all())
+    
+    async def search(
+            self,
+            db: AsyncSession,
+            owner_id: int,
+            query_text: str,
+            limit: int,
+            after: Optional[Sequence[Any]] = None
+    ) -> List[Tuple[Task, float]]:
+        """
+        Полнотекстовый поиск задач пользователя по названию и описанию (GIN-индекс по search_vector).
+        Результаты упорядочены по релевантности (ts_rank) и ID, страница начинается
+        строго после значений after (keyset-пагинация по (rank, id)).
+        :param db: сессия SQLAlchemy
+        :param owner_id: ID пользователя
+        :param query_text: поисковый запрос в синтаксисе websearch_to_tsquery
+        :param limit: максимальное количество задач
+        :param after: значения (rank, id) последней задачи предыдущей страницы
+        :return: задачи и их релевантность
+        """
+        ts_query = func.websearch_to_tsquery(cast(literal(SEARCH_CONFIG), REGCONFIG), query_text)
+        rank = func.ts_rank(Task.search_vector, ts_query)
+        rank_label = rank.label("rank")
+        query = select(Task, rank_label).where(
+            Task.owner_id == owner_id,
+            Task.search_vector.bool_op("@@")(ts_query)
+        )
+        if after is not None:
+            query = query.where(tuple_(rank, Task.id) < tuple_(*after))
+        query = query.order_by(rank_label.desc(), Task.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return [(task, rank_value) for task, rank_value in result.all()]
@@ -0,0 +1,61 @@
+from typing import List, Tuple
+
+from sqlalchemy import select, update, func, any_, and_, bindparam, or_, literal_column, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Task, TaskStats, User
+from app.repo.BaseRepository import BaseRepository
+
+
+class TaskStatsRepository(BaseRepository[TaskStats]):
+    def __init__(self) -> None:
+        super().__init__(TaskStats)
+    
+    async def reconcile(self, db: AsyncSession, after_owner_id: int, limit: int) -> Tuple[List[int], List[int]]:
+        """
+        Пересчет счетчиков пачки пользователей по таблице tasks с исправлением расхождений.
+        Строки счетчиков блокируются до подсчета задач, поэтому изменения задач
+        в параллельных транзакциях не теряются: подсчет выполняется после их коммита.
+        :param db: сессия SQLAlchemy
+        :param after_owner_id: ID пользователя, после которого начинается пачка
+        :param limit: размер пачки пользователей
+        :return: ID проверенных пользователей и ID пользователей с исправленными счетчиками
+        """
+        result = await db.execute(select(User.id).where(User.id > after_owner_id).order_by(User.id).limit(limit))
+        owner_ids = list(result.scalars().all())
+        if not owner_ids:
+            return [], []
+        ids = bindparam("owner_ids", owner_ids, type_=ARRAY(Integer))
+        
+        # счетчики пользователей, для которых их еще нет
+        await db.execute(
+            pg_insert(TaskStats).from_select(
+                ["owner_id", "total", "completed"],
+                select(User.id, literal_column("0"), literal_column("0")).where(User.id == any_(ids))
+            ).on_conflict_do_nothing()
+        )
+        await db.execute(
+            select(TaskStats.owner_id).where(TaskStats.owner_id == any_(ids))
+            .order_by(TaskStats.owner_id).with_for_update()
+        )
+        
+        actual = select(
+            User.id.label("owner_id"),
+            func.count(Task.id).label("total"),
+            func.count(Task.id).filter(Task.is_completed.is_(True)).label("completed")
+        ).outerjoin(
+            # явное условие по ключу секционирования: PostgreSQL не выводит его из User.id = ANY(...),
+            # а без него читал бы все секции tasks
+            Task, and_(Task.owner_id == User.id, Task.owner_id == any_(ids))
+        ).where(User.id == any_(ids)).group_by(User.id).subquery()
+        result = await db.execute(
+            update(TaskStats)
+            .where(
+                TaskStats.owner_id == actual.c.owner_id,
+                or_(TaskStats.total != actual.c.total, TaskStats.completed != actual.c.completed)
+            )
+            .values(total=actual.c.total, completed=actual.c.completed, version=func.nextval("tasks_version_seq"))
+            .returning(TaskStats.owner_id)
+        )
+        return owner_ids, list(result.scalars().all())
@@ -1,3 +1,4 @@
 from .BaseRepository import *
 from .TaskRepository import *
+from .TaskStatsRepository import *
 from .UserRepository import *
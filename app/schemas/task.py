@@ -38,3 +38,40 @@ class TaskOut(TaskBase):
     class Config:
         orm_mode = True
 
+
+class TaskPage(BaseModel):
+    items: List[TaskOut]
+    next_cursor: Optional[str] = None
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class TaskBulkResult(BaseModel):
+    id: int
+    status: str
+    task: Optional[TaskOut] = None
+
+
+class TaskImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[TaskImportError] = []
+
+
+class TaskStatsOut(BaseModel):
+    total: int
+    completed: int
+    pending: int
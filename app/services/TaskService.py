@@ -1,15 +1,64 @@
+import json
+import time
+from functools import partial
+from typing import Optional, AsyncIterator, Any, Union, Sequence
+
+from pydantic import TypeAdapter, ValidationError
+
 from app.models import Task
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.core.events import task_events
+from app.core.pagination import encode_cursor, decode_cursor
+from app.db.database import on_commit
 from app.repo import TaskRepository
-from app.schemas import TaskCreate, TaskUpdate
+from app.repo.TaskRepository import SORT_KEYS
+from app.schemas import TaskCreate, TaskUpdate, TaskBulkUpdate, TaskImportResult, TaskImportError, TaskResponse
 from app.services import BaseService
 
+# Валидация пачки задач импорта одним вызовом pydantic
+task_create_list = TypeAdapter(list[TaskCreate])
+
+# Поля задачи в событиях потока изменений (в порядке полей схемы TaskResponse)
+TASK_EVENT_FIELDS = tuple(TaskResponse.model_fields)
+
+# Поля задачи, загружаемые при импорте (в порядке значений записей COPY)
+IMPORT_COLUMNS = ("title", "description", "is_completed", "owner_id")
+
 
 class TaskService(BaseService[Task]):
     def __init__(self):
         super().__init__(TaskRepository)
     
+    @staticmethod
+    def _task_event(event_type: str, task: Task) -> dict[str, Any]:
+        """
+        Событие изменения задачи для потока изменений пользователя.
+        Данные задачи берутся из колонок как есть, без валидации схемой: ошибка
+        сериализации события не должна отменять уже выполненное изменение.
+        :param event_type: тип события (created, updated)
+        :param task: задача
+        :return:
+        """
+        task_data = {field: getattr(task, field) for field in TASK_EVENT_FIELDS}
+        return {"type": event_type, "task_id": task.id, "task": task_data}
+    
+    @staticmethod
+    def _publish_events(db: AsyncSession, user_id: int, events: list[dict[str, Any]]) -> None:
+        """
+        Публикация событий в поток изменений пользователя после коммита транзакции.
+        События сериализуются сразу: после коммита ORM-объекты истекают.
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :param events: события
+        :return:
+        """
+        if events:
+            payloads = [json.dumps(event, ensure_ascii=False) for event in events]
+            on_commit(db, partial(task_events.publish, user_id, payloads))
+    
     async def create_task(self, db: AsyncSession, task_data: TaskCreate, user_id: int) -> Task:
         """
         Создаёт задачу со значениями task_data и owner_id=user_id
@@ -23,6 +72,7 @@ class TaskService(BaseService[Task]):
         task = await self.create(db, task_data_dict)
         if not task:
             raise ValueError("Task could not be created")
+        self._publish_events(db, user_id, [self._task_event("created", task)])
         return task
     
     async def get_task_by_id(self, db: AsyncSession, task_id: int, user_id: int) -> Task:
@@ -38,17 +88,108 @@ class TaskService(BaseService[Task]):
             raise ValueError("Not found")
         return task
     
-    async def get_tasks_by_user(self, db: AsyncSession, user_id: int) -> list[Task]:
+    async def get_task_version(self, db: AsyncSession, task_id: int, user_id: int) -> Optional[int]:
         """
-        Получение всех задач пользователя.
+        Версия задачи пользователя (для ETag).
         :param db: Сессия SQLAlchemy
+        :param task_id: ID задачи
         :param user_id: ID пользователя
-        :return:
+        :return: версия или None, если задача не найдена
         """
-        tasks = await self.repo.get_all(db, filters={"owner_id": user_id})
-        if not tasks:
-            raise ValueError("Not found")
-        return tasks
+        return await self.repo.get_version(db, task_id, user_id)
+    
+    async def get_tasks_page(
+            self,
+            db: AsyncSession,
+            user_id: int,
+            limit: int,
+            after: Optional[str] = None,
+            sort: str = "id",
+            is_completed: Optional[bool] = None,
+            title_prefix: Optional[str] = None,
+            columns: Optional[Sequence[str]] = None
+    ) -> tuple[Union[list[Task], list[Row]], Optional[str]]:
+        """
+        Получение страницы задач пользователя с фильтрами, сортировкой и курсором
+        по (owner_id, <ключ сортировки>).
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :param limit: максимальное количество задач на странице
+        :param after: курсор, полученный вместе с предыдущей страницей
+        :param sort: сортировка: id, title, -id или -title (по убыванию)
+        :param is_completed: фильтр по статусу выполнения
+        :param title_prefix: фильтр по префиксу названия
+        :param columns: поля задачи; если заданы, вместо ORM-объектов возвращаются строки
+            с этими полями (должны включать id и title)
+        :return: задачи страницы и курсор следующей страницы (None, если страница последняя)
+        """
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Invalid sort: {sort}")
+        
+        after_values = None
+        if after is not None:
+            after_values = decode_cursor(after, size=len(SORT_KEYS[sort]) + 1)
+            if after_values[0] != user_id:
+                raise ValueError("Invalid cursor")
+            after_values = after_values[1:]
+        
+        # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+        tasks = await self.repo.get_page_sorted(
+            db, user_id, limit=limit + 1, sort=sort, descending=descending, after=after_values,
+            is_completed=is_completed, title_prefix=title_prefix, columns=columns
+        )
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = encode_cursor([user_id, last.title, last.id] if sort == "title" else [user_id, last.id])
+        return tasks, next_cursor
+    
+    async def search_tasks(
+            self,
+            db: AsyncSession,
+            user_id: int,
+            query_text: str,
+            limit: int,
+            after: Optional[str] = None
+    ) -> tuple[list[Task], Optional[str]]:
+        """
+        Полнотекстовый поиск задач пользователя с курсором по (rank, id).
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :param query_text: поисковый запрос
+        :param limit: максимальное количество задач на странице
+        :param after: курсор, полученный вместе с предыдущей страницей
+        :return: задачи страницы в порядке релевантности и курсор следующей страницы
+        """
+        after_values = None
+        if after is not None:
+            after_values = decode_cursor(after, size=3)
+            if after_values[0] != user_id:
+                raise ValueError("Invalid cursor")
+            after_values = after_values[1:]
+        
+        # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+        results = await self.repo.search(db, user_id, query_text, limit=limit + 1, after=after_values)
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            task, rank = results[-1]
+            next_cursor = encode_cursor([user_id, rank, task.id])
+        return [task for task, _ in results], next_cursor
+    
+    def stream_tasks(self, db: AsyncSession, user_id: int) -> AsyncIterator[list[Row]]:
+        """
+        Потоковое чтение всех задач пользователя пачками строк (в порядке ID).
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :return: асинхронный итератор пачек строк задач
+        """
+        return self.repo.stream(
+            db, filters={"owner_id": user_id}, keys=("owner_id", "id"), batch_size=settings.TASKS_EXPORT_BATCH_SIZE
+        )
     
     async def update_task(self, db: AsyncSession, task_id: int, task_data: TaskUpdate, user_id: int) -> Task:
         """
@@ -59,9 +200,12 @@ class TaskService(BaseService[Task]):
         :param user_id: ID пользователя
         :return:
         """
-        updated_task = await self.update(db, filters={"id": task_id, "owner_id": user_id}, obj_in=task_data)
+        updated_task = await self.repo.update_returning(
+            db, filters={"id": task_id, "owner_id": user_id}, update_data=task_data.dict(exclude_unset=True)
+        )
         if not updated_task:
             raise ValueError("Task could not be updated")
+        self._publish_events(db, user_id, [self._task_event("updated", updated_task)])
         return updated_task
     
     async def delete_task(self, db: AsyncSession, task_id: int, user_id: int) -> Task:
@@ -72,7 +216,158 @@ class TaskService(BaseService[Task]):
         :param user_id: ID пользователя
         :return:
         """
-        task = await self.delete(db, filters={"id": task_id, "owner_id": user_id})
+        task = await self.repo.delete_returning(db, filters={"id": task_id, "owner_id": user_id})
         if not task:
             raise ValueError("Task could not be deleted")
+        self._publish_events(db, user_id, [{"type": "deleted", "task_id": task_id}])
         return task
+    
+    @staticmethod
+    def _check_bulk_size(items: list) -> None:
+        """
+        Проверка размера пакета задач.
+        :param items: элементы пакета
+        :return:
+        """
+        if len(items) > settings.TASKS_BULK_MAX_ITEMS:
+            raise ValueError(f"Too many items in bulk request (max {settings.TASKS_BULK_MAX_ITEMS})")
+    
+    async def create_tasks(self, db: AsyncSession, tasks_data: list[TaskCreate], user_id: int) -> list[Task]:
+        """
+        Создание нескольких задач пользователя в одной транзакции.
+        :param db: Сессия SQLAlchemy
+        :param tasks_data: Данные задач
+        :param user_id: ID пользователя
+        :return: созданные задачи в порядке tasks_data
+        """
+        self._check_bulk_size(tasks_data)
+        data = [{**task_data.dict(), "owner_id": user_id} for task_data in tasks_data]
+        tasks = await self.repo.create_many(db, data)
+        self._publish_events(db, user_id, [self._task_event("created", task) for task in tasks])
+        return tasks
+    
+    async def update_tasks(
+            self,
+            db: AsyncSession,
+            tasks_data: list[TaskBulkUpdate],
+            user_id: int
+    ) -> list[Optional[Task]]:
+        """
+        Обновление нескольких задач пользователя в одной транзакции.
+        :param db: Сессия SQLAlchemy
+        :param tasks_data: Новые данные задач (с ID задачи)
+        :param user_id: ID пользователя
+        :return: обновленные задачи в порядке tasks_data (None, если задача не найдена)
+        """
+        self._check_bulk_size(tasks_data)
+        task_ids = [task_data.id for task_data in tasks_data]
+        if len(set(task_ids)) != len(task_ids):
+            raise ValueError("Duplicate task id in bulk request")
+        
+        update_data = [{**task_data.dict(exclude_unset=True), "id": task_data.id} for task_data in tasks_data]
+        updated_tasks = await self.repo.update_many(db, filters={"owner_id": user_id}, update_data=update_data)
+        updated_by_id = {task.id: task for task in updated_tasks}
+        self._publish_events(db, user_id, [self._task_event("updated", task) for task in updated_tasks])
+        return [updated_by_id.get(task_id) for task_id in task_ids]
+    
+    async def delete_tasks(self, db: AsyncSession, task_ids: list[int], user_id: int) -> list[bool]:
+        """
+        Удаление нескольких задач пользователя в одной транзакции.
+        :param db: Сессия SQLAlchemy
+        :param task_ids: ID задач
+        :param user_id: ID пользователя
+        :return: признак удаления для каждой задачи в порядке task_ids
+        """
+        self._check_bulk_size(task_ids)
+        deleted_ids = set(await self.repo.delete_many(db, filters={"owner_id": user_id}, keys=task_ids))
+        self._publish_events(
+            db, user_id, [{"type": "deleted", "task_id": task_id} for task_id in task_ids if task_id in deleted_ids]
+        )
+        return [task_id in deleted_ids for task_id in task_ids]
+    
+    async def import_tasks(
+            self,
+            db: AsyncSession,
+            batches: AsyncIterator[list[tuple[int, Optional[dict[str, Any]], Optional[str]]]],
+            user_id: int
+    ) -> TaskImportResult:
+        """
+        Потоковый импорт задач пользователя в одной транзакции.
+        Записи валидируются по схеме TaskCreate пачками по TASKS_IMPORT_CHUNK_SIZE
+        и загружаются протоколом COPY. Некорректные записи пропускаются и попадают
+        в список ошибок с номером строки (не больше TASKS_IMPORT_MAX_ERRORS).
+        :param db: Сессия SQLAlchemy
+        :param batches: асинхронный итератор пачек (номер строки, словарь, ошибка разбора)
+        :param user_id: ID пользователя
+        :return: количество загруженных и пропущенных задач, скорость загрузки, ошибки
+        """
+        started = time.perf_counter()
+        result = TaskImportResult(imported=0, failed=0, elapsed_seconds=0, rows_per_second=0)
+        chunk = []
+        async for batch in batches:
+            for line, data, error in batch:
+                if error is not None:
+                    self._add_import_error(result, line, error)
+                else:
+                    chunk.append((line, data))
+            if len(chunk) >= settings.TASKS_IMPORT_CHUNK_SIZE:
+                await self._import_chunk(db, chunk, user_id, result)
+                chunk = []
+        await self._import_chunk(db, chunk, user_id, result)
+        if result.imported:
+            # одно событие вместо события на каждую задачу: клиенты перечитывают список
+            self._publish_events(db, user_id, [{"type": "imported", "count": result.imported}])
+        
+        result.errors.sort(key=lambda error: error.line)
+        result.elapsed_seconds = round(time.perf_counter() - started, 3)
+        if result.elapsed_seconds:
+            result.rows_per_second = round(result.imported / result.elapsed_seconds, 1)
+        return result
+    
+    async def _import_chunk(
+            self,
+            db: AsyncSession,
+            chunk: list[tuple[int, dict[str, Any]]],
+            user_id: int,
+            result: TaskImportResult
+    ) -> None:
+        """
+        Валидация и загрузка пачки задач импорта.
+        Пачка проверяется одним вызовом pydantic, а при ошибках - по одной записи,
+        чтобы определить некорректные строки.
+        :param db: Сессия SQLAlchemy
+        :param chunk: пачка записей (номер строки, словарь)
+        :param user_id: ID пользователя
+        :param result: результат импорта (обновляется)
+        :return:
+        """
+        if not chunk:
+            return
+        try:
+            tasks = task_create_list.validate_python([data for _, data in chunk])
+        except ValidationError:
+            tasks = []
+            for line, data in chunk:
+                try:
+                    tasks.append(TaskCreate.model_validate(data))
+                except ValidationError as e:
+                    error = e.errors()[0]
+                    field = ".".join(str(part) for part in error["loc"])
+                    self._add_import_error(result, line, f"{field}: {error['msg']}" if field else error["msg"])
+        
+        result.imported += await self.repo.copy_records(
+            db, IMPORT_COLUMNS, ((task.title, task.description, False, user_id) for task in tasks)
+        )
+    
+    @staticmethod
+    def _add_import_error(result: TaskImportResult, line: int, error: str) -> None:
+        """
+        Учет некорректной записи импорта.
+        :param result: результат импорта (обновляется)
+        :param line: номер строки
+        :param error: описание ошибки
+        :return:
+        """
+        result.failed += 1
+        if len(result.errors) < settings.TASKS_IMPORT_MAX_ERRORS:
+            result.errors.append(TaskImportError(line=line, error=error))
@@ -0,0 +1,43 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import TaskStats
+from app.repo import TaskStatsRepository
+from app.schemas import TaskStatsOut
+from app.services import BaseService
+
+
+class TaskStatsService(BaseService[TaskStats]):
+    def __init__(self):
+        super().__init__(TaskStatsRepository)
+    
+    async def get_stats(self, db: AsyncSession, user_id: int) -> TaskStatsOut:
+        """
+        Получение количества задач пользователя по счетчикам (без подсчета задач).
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :return:
+        """
+        stats = await self.get(db, filters={"owner_id": user_id})
+        if not stats:
+            return TaskStatsOut(total=0, completed=0, pending=0)
+        return TaskStatsOut(total=stats.total, completed=stats.completed, pending=stats.total - stats.completed)
+    
+    async def get_version(self, db: AsyncSession, user_id: int) -> int:
+        """
+        Версия списка задач пользователя (меняется при любом изменении его задач).
+        :param db: Сессия SQLAlchemy
+        :param user_id: ID пользователя
+        :return:
+        """
+        stats = await self.get(db, filters={"owner_id": user_id})
+        return stats.version if stats else 0
+    
+    async def reconcile(self, db: AsyncSession, after_user_id: int, limit: int) -> tuple[list[int], list[int]]:
+        """
+        Сверка и исправление счетчиков пачки пользователей.
+        :param db: Сессия SQLAlchemy
+        :param after_user_id: ID пользователя, после которого начинается пачка
+        :param limit: размер пачки пользователей
+        :return: ID проверенных пользователей и ID пользователей с исправленными счетчиками
+        """
+        return await self.repo.reconcile(db, after_user_id, limit)
@@ -1,13 +1,11 @@
 from app.models import User
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.security import hash_password, verify_password
 from app.repo.UserRepository import UserRepository
 from app.schemas.user import UserCreate, UserUpdate
 from app.services.BaseService import BaseService
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class UserService(BaseService[User]):
     def __init__(self):
@@ -23,7 +21,7 @@ class UserService(BaseService[User]):
         existing_user = await self.repo.get(db, filters={"email": user_data.email})
         if existing_user:
             raise ValueError(f"User with email {user_data.email} already exists")
-        hashed_password = pwd_context.hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         
         del user_data.password
         
@@ -43,7 +41,7 @@ class UserService(BaseService[User]):
         
         if not user:
             raise ValueError(f"User with email {email} not found")
-        if not pwd_context.verify(password, user.hashed_password):
+        if not await verify_password(password, user.hashed_password):
             raise ValueError(f"User password is does not match")
         return user
     
@@ -1,3 +1,4 @@
 from .BaseService import *
 from .UserService import *
 from .TaskService import *
+from .TaskStatsService import *
\ No newline at end of file
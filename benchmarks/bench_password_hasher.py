@@ -0,0 +1,72 @@
+"""
+Бенчмарк: задержка обработки запросов во время «шторма» логинов.
+
+Моделирует воркер uvicorn, который одновременно обслуживает лёгкие запросы
+(как GET /tasks из кэша) и пачку параллельных логинов с проверкой bcrypt.
+Сравнивает проверку пароля в event loop (как раньше в UserService)
+и через PasswordHasher с пулом процессов.
+
+Запуск:
+    python -m benchmarks.bench_password_hasher --logins 64 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.core.hasher import PasswordHasher, pwd_context
+from benchmarks.common import summarize
+
+
+async def probe(latencies, stop, interval):
+    """
+    Лёгкий «запрос», который должен выполняться каждые interval секунд;
+    задержка — насколько позже запланированного он получил управление.
+    """
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run(hasher, hashed, logins, interval):
+    latencies = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(latencies, stop, interval))
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(hasher.verify("password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    await probe_task
+    return {
+        "logins": logins,
+        "logins_per_second": round(logins / elapsed, 1),
+        "probe_requests": len(latencies),
+        "probe_latency": summarize(latencies),
+    }
+
+
+async def main(args):
+    hashed = pwd_context.hash("password")
+    
+    inline = PasswordHasher(max_workers=0)
+    pooled = PasswordHasher(max_workers=args.workers)
+    # прогрев пула, чтобы запуск процессов не попал в измерение
+    await asyncio.gather(*(pooled.verify("password", hashed) for _ in range(args.workers)))
+    
+    report = {
+        "inline": await run(inline, hashed, args.logins, args.interval),
+        "process_pool": await run(pooled, hashed, args.logins, args.interval),
+    }
+    pooled.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64, help="количество параллельных логинов")
+    parser.add_argument("--workers", type=int, default=4, help="размер пула процессов")
+    parser.add_argument("--interval", type=float, default=0.005, help="период лёгких запросов, с")
+    asyncio.run(main(parser.parse_args()))
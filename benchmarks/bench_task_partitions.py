@@ -0,0 +1,145 @@
+"""
+Бенчмарк: задержка чтения страницы задач одного пользователя в несекционированной таблице
+и в таблице, секционированной хэшем owner_id (как tasks после миграции 0008).
+
+Создает в схеме bench_partitions две таблицы с одинаковыми задачами (N пользователей по M задач,
+задачи пользователей чередуются, как при обычной работе), повторяет запрос первой страницы
+списка задач (GET /tasks) и страницы после случайного курсора для случайных пользователей
+и выводит p50/p95/p99 обоих вариантов и количество секций, которые читает запрос.
+Схема удаляется после замеров. Нужен PostgreSQL из переменных окружения.
+
+Запуск:
+    python -m benchmarks.bench_task_partitions --users 10000 --tasks 100 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.database import engine
+from app.models.Task import TASKS_PARTITIONS
+from benchmarks.common import summarize
+
+SCHEMA = "bench_partitions"
+COLUMNS = (
+    "id integer NOT NULL, title varchar NOT NULL, description varchar, is_completed boolean, owner_id integer NOT NULL"
+)
+
+# Запрос страницы списка задач пользователя (TaskRepository.get_page_sorted с сортировкой по id)
+PAGE_QUERY = (
+    "SELECT id, title, description, is_completed, owner_id FROM {table} "
+    "WHERE owner_id = :owner_id AND id > :after_id ORDER BY id LIMIT :limit"
+)
+
+
+async def create_tables(conn: AsyncConnection, users: int, tasks: int) -> None:
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    
+    # tasks до миграции 0007: первичный ключ по id и индекс (owner_id, id)
+    await conn.execute(text(f"CREATE TABLE {SCHEMA}.tasks_plain ({COLUMNS}, PRIMARY KEY (id))"))
+    await conn.execute(text(f"CREATE INDEX ON {SCHEMA}.tasks_plain (owner_id, id)"))
+    
+    # tasks после миграции 0008: первичный ключ (owner_id, id) в каждой секции
+    await conn.execute(text(
+        f"CREATE TABLE {SCHEMA}.tasks_hash ({COLUMNS}, PRIMARY KEY (owner_id, id)) PARTITION BY HASH (owner_id)"
+    ))
+    for remainder in range(TASKS_PARTITIONS):
+        await conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.tasks_hash_p{remainder:02d} PARTITION OF {SCHEMA}.tasks_hash "
+            f"FOR VALUES WITH (MODULUS {TASKS_PARTITIONS}, REMAINDER {remainder})"
+        ))
+    
+    for table in ("tasks_plain", "tasks_hash"):
+        await conn.execute(text(
+            f"INSERT INTO {SCHEMA}.{table} (id, title, description, is_completed, owner_id) "
+            "SELECT (t - 1) * :users + u, 'Task ' || t, 'Description of task ' || t, t % 2 = 0, u "
+            "FROM generate_series(1, :tasks) AS t, generate_series(1, :users) AS u"
+        ), {"users": users, "tasks": tasks})
+        await conn.execute(text(f"ANALYZE {SCHEMA}.{table}"))
+
+
+def scanned_relations(plan: Dict[str, Any]) -> List[str]:
+    """
+    Таблицы (секции), которые читает план запроса
+    :param plan: узел плана EXPLAIN (FORMAT JSON)
+    :return:
+    """
+    relations = [plan["Relation Name"]] if "Relation Name" in plan else []
+    for child in plan.get("Plans", ()):
+        relations.extend(scanned_relations(child))
+    return relations
+
+
+async def partitions_scanned(conn: AsyncConnection, table: str, owner_id: int, limit: int) -> int:
+    query = PAGE_QUERY.format(table=f"{SCHEMA}.{table}")
+    result = await conn.execute(
+        text(f"EXPLAIN (FORMAT JSON) {query}"), {"owner_id": owner_id, "after_id": 0, "limit": limit}
+    )
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return len(set(scanned_relations(plan[0]["Plan"])))
+
+
+async def measure(conn: AsyncConnection, table: str, args) -> Dict[str, float]:
+    """
+    Задержки запроса страницы задач случайных пользователей, мс
+    """
+    query = text(PAGE_QUERY.format(table=f"{SCHEMA}.{table}"))
+    rng = random.Random(args.seed)
+    latencies = []
+    for i in range(args.warmup + args.requests):
+        owner_id = rng.randint(1, args.users)
+        # половина запросов - первая страница, половина - страница после случайного курсора
+        after_id = 0 if i % 2 == 0 else rng.randint(0, args.tasks - 1) * args.users
+        started = time.perf_counter()
+        result = await conn.execute(query, {"owner_id": owner_id, "after_id": after_id, "limit": args.limit})
+        result.all()
+        if i >= args.warmup:
+            latencies.append((time.perf_counter() - started) * 1000)
+    return summarize(latencies)
+
+
+async def main(args):
+    async with engine.connect() as conn:
+        await create_tables(conn, args.users, args.tasks)
+        await conn.commit()
+        try:
+            owner_id = random.Random(args.seed).randint(1, args.users)
+            results = {
+                "users": args.users,
+                "tasks_per_user": args.tasks,
+                "partitions": TASKS_PARTITIONS,
+                "limit": args.limit,
+                "unpartitioned": {
+                    "tables_scanned": await partitions_scanned(conn, "tasks_plain", owner_id, args.limit),
+                    **await measure(conn, "tasks_plain", args),
+                },
+                "partitioned": {
+                    "tables_scanned": await partitions_scanned(conn, "tasks_hash", owner_id, args.limit),
+                    **await measure(conn, "tasks_hash", args),
+                },
+            }
+            await conn.rollback()
+        finally:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000, help="количество пользователей")
+    parser.add_argument("--tasks", type=int, default=100, help="количество задач пользователя")
+    parser.add_argument("--requests", type=int, default=2000, help="количество замеряемых запросов")
+    parser.add_argument("--warmup", type=int, default=200, help="количество запросов прогрева")
+    parser.add_argument("--limit", type=int, default=100, help="размер страницы")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+Микробенчмарк: стоимость сериализации страницы задач GET /tasks в пересчете на строку.
+
+Сравнивает обычный путь (ORM-объекты Task -> TaskPage -> повторная валидация
+response_model в FastAPI -> JSONResponse со стандартным json) и быстрый путь
+TASKS_FAST_JSON (строки с нужными колонками -> encode_task_page -> RawJSONResponse).
+Загрузка строк из БД не измеряется. Проверяет, что оба пути дают одинаковый JSON.
+
+Запуск:
+    python -m benchmarks.bench_task_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.formats import encode_task_page, RawJSONResponse, TASK_OUT_FIELDS
+from app.models import Task
+from app.schemas import TaskPage
+
+response_field = create_model_field("Response_get_tasks", TaskPage)
+
+
+def make_rows(count: int):
+    return [
+        (f"Task {i}", None if i % 3 else f"Description of task {i}", i, 1)
+        for i in range(count)
+    ]
+
+
+async def orm_path(rows) -> bytes:
+    tasks = [Task(**dict(zip(TASK_OUT_FIELDS, row)), is_completed=False) for row in rows]
+    page = TaskPage.model_validate({"items": tasks, "next_cursor": "cursor"}, from_attributes=True)
+    content = await serialize_response(field=response_field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows) -> bytes:
+    return RawJSONResponse(encode_task_page(rows, "cursor")).body
+
+
+async def measure(path, rows, repeat: int) -> float:
+    """
+    Среднее время на строку, мкс
+    """
+    await path(rows)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(rows)
+    return (time.perf_counter() - started) / (repeat * len(rows)) * 1e6
+
+
+async def main(args):
+    rows = make_rows(args.rows)
+    assert json.loads(await orm_path(rows)) == json.loads(await fast_path(rows)), "outputs differ"
+    
+    orm_us = await measure(orm_path, rows, args.repeat)
+    fast_us = await measure(fast_path, rows, args.repeat)
+    print(json.dumps({
+        "rows": args.rows,
+        "orm_us_per_row": round(orm_us, 3),
+        "fast_us_per_row": round(fast_us, 3),
+        "speedup": round(orm_us / fast_us, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="количество задач на странице")
+    parser.add_argument("--repeat", type=int, default=50, help="количество повторов")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,31 @@
+"""
+Общие функции бенчмарков
+"""
+from typing import Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Перцентиль q (0..1) по методу ближайшего ранга
+    :param values: значения
+    :param q: уровень
+    :return:
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99 и максимум задержек, мс
+    :param latencies_ms: задержки, мс
+    :return:
+    """
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(latencies_ms, 0.50), 2),
+        "p95_ms": round(percentile(latencies_ms, 0.95), 2),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 2),
+        "max_ms": round(max(latencies_ms), 2),
+    }
@@ -0,0 +1,267 @@
+"""
+Нагрузочный бенчмарк API задач.
+
+Поднимает app.main:app в процессе (через ASGI-транспорт httpx, с PostgreSQL и Redis
+из переменных окружения, например из docker-compose) или работает с уже запущенным
+сервером (--base-url), создает N пользователей с M задачами у каждого и прогоняет
+сценарии нагрузки:
+    login  - «шторм» логинов (POST /login);
+    read   - чтение: 90% GET /tasks (постранично), 10% GET /tasks/{id};
+    write  - запись: 50% POST /tasks, 50% PUT /tasks/{id}.
+Для каждого эндпоинта выводит req/s и p50/p95/p99 в JSON, чтобы сравнивать коммиты.
+
+Запуск:
+    python -m benchmarks.load --users 20 --tasks 1000 --duration 10 --output bench_output.json
+    python -m benchmarks.load --base-url http://localhost:8000 --workloads read,write
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import summarize
+
+PASSWORD = "benchmark-password"
+BULK_CHUNK = 1000
+
+
+class Recorder:
+    """
+    Задержки и ошибки по эндпоинтам (шаблонам маршрутов)
+    """
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+    
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+    
+    def report(self, elapsed: float) -> Dict[str, object]:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "rps": round(len(latencies) / elapsed, 1),
+                **summarize(latencies),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {"elapsed_s": round(elapsed, 2), "rps": round(total / elapsed, 1), "endpoints": endpoints}
+
+
+class User:
+    """
+    Пользователь бенчмарка со своим HTTP-клиентом (и cookie с JWT)
+    """
+    
+    def __init__(self, client: httpx.AsyncClient, email: str):
+        self.client = client
+        self.email = email
+        self.task_ids: List[int] = []
+    
+    async def login(self, recorder: Optional[Recorder] = None) -> None:
+        data = {"username": self.email, "password": PASSWORD}
+        if recorder is None:
+            response = await self.client.post("/login", data=data)
+        else:
+            response = await recorder.request(self.client, "POST /login", "POST", "/login", data=data)
+        response.raise_for_status()
+        # cookie выставляется с флагом Secure, поэтому переносим токен вручную,
+        # чтобы он отправлялся и по http
+        self.client.cookies.set("access_token", response.cookies["access_token"])
+
+
+async def seed(make_client, users: int, tasks: int, seed_value: int) -> List[User]:
+    """
+    Регистрация пользователей и генерация задач пакетами через POST /tasks/bulk
+    :param make_client: фабрика HTTP-клиентов
+    :param users: количество пользователей
+    :param tasks: количество задач у каждого пользователя
+    :param seed_value: seed генератора данных
+    :return:
+    """
+    rnd = random.Random(seed_value)
+    run_id = uuid.uuid4().hex[:8]
+    result = []
+    for i in range(users):
+        user = User(make_client(), f"bench-{run_id}-{i}@example.com")
+        response = await user.client.post("/register", json={"email": user.email, "password": PASSWORD})
+        response.raise_for_status()
+        await user.login()
+        
+        for start in range(0, tasks, BULK_CHUNK):
+            chunk = [
+                {"title": f"Task {n} {rnd.randrange(10 ** 6)}", "description": rnd.choice([None, "benchmark task"])}
+                for n in range(start, min(start + BULK_CHUNK, tasks))
+            ]
+            response = await user.client.post("/tasks/bulk", json=chunk)
+            response.raise_for_status()
+            user.task_ids.extend(item["id"] for item in response.json())
+        result.append(user)
+    return result
+
+
+async def login_storm(users: List[User], recorder: Recorder, rnd: random.Random) -> None:
+    await rnd.choice(users).login(recorder)
+
+
+async def read_heavy(users: List[User], recorder: Recorder, rnd: random.Random) -> None:
+    user = rnd.choice(users)
+    if rnd.random() < 0.9 or not user.task_ids:
+        response = await recorder.request(user.client, "GET /tasks", "GET", "/tasks", params={"limit": 100})
+        next_cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if next_cursor and rnd.random() < 0.5:
+            await recorder.request(
+                user.client, "GET /tasks", "GET", "/tasks", params={"limit": 100, "after": next_cursor}
+            )
+    else:
+        task_id = rnd.choice(user.task_ids)
+        await recorder.request(user.client, "GET /tasks/{task_id}", "GET", f"/tasks/{task_id}")
+
+
+async def write_heavy(users: List[User], recorder: Recorder, rnd: random.Random) -> None:
+    user = rnd.choice(users)
+    if rnd.random() < 0.5 or not user.task_ids:
+        response = await recorder.request(
+            user.client, "POST /tasks", "POST", "/tasks",
+            json={"title": f"New task {rnd.randrange(10 ** 6)}", "description": None}
+        )
+        if response.status_code == 200:
+            user.task_ids.append(response.json()["id"])
+    else:
+        task_id = rnd.choice(user.task_ids)
+        await recorder.request(
+            user.client, "PUT /tasks/{task_id}", "PUT", f"/tasks/{task_id}",
+            json={"title": f"Updated {rnd.randrange(10 ** 6)}", "description": None,
+                  "is_completed": rnd.random() < 0.5}
+        )
+
+
+WORKLOADS = {
+    "login": login_storm,
+    "read": read_heavy,
+    "write": write_heavy,
+}
+
+
+async def run_workload(workload, users: List[User], concurrency: int, duration: float, seed_value: int):
+    """
+    Запуск сценария: concurrency параллельных клиентов в течение duration секунд
+    """
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    
+    async def worker(n: int):
+        rnd = random.Random(seed_value + n)
+        while time.perf_counter() < deadline:
+            await workload(users, recorder, rnd)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def client_factory(base_url: str):
+    """
+    Фабрика HTTP-клиентов: к запущенному серверу или к app.main:app в процессе
+    """
+    clients = []
+    if base_url:
+        def make_client():
+            client = httpx.AsyncClient(base_url=base_url, timeout=60)
+            clients.append(client)
+            return client
+        
+        try:
+            yield make_client
+        finally:
+            await asyncio.gather(*(client.aclose() for client in clients))
+        return
+    
+    from app.api.limiter import limiter
+    from app.main import app
+    
+    # лимит запросов рассчитан на клиентов, а не на бенчмарк
+    limiter.enabled = False
+    transport = httpx.ASGITransport(app=app)
+    
+    def make_client():
+        client = httpx.AsyncClient(transport=transport, base_url="https://testserver", timeout=60)
+        clients.append(client)
+        return client
+    
+    async with app.router.lifespan_context(app):
+        try:
+            yield make_client
+        finally:
+            await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args):
+    workloads = args.workloads.split(",")
+    for name in workloads:
+        if name not in WORKLOADS:
+            raise SystemExit(f"Unknown workload: {name}")
+    
+    async with client_factory(args.base_url) as make_client:
+        seed_started = time.perf_counter()
+        users = await seed(make_client, args.users, args.tasks, args.seed)
+        seed_elapsed = time.perf_counter() - seed_started
+        
+        results = {}
+        for name in workloads:
+            results[name] = await run_workload(WORKLOADS[name], users, args.concurrency, args.duration, args.seed)
+    
+    report = {
+        "revision": git_revision(),
+        "target": args.base_url or "in-process",
+        "params": {
+            "users": args.users,
+            "tasks_per_user": args.tasks,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "seed": args.seed,
+        },
+        "seed_s": round(seed_elapsed, 2),
+        "workloads": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="", help="URL запущенного сервера (по умолчанию - app в процессе)")
+    parser.add_argument("--users", type=int, default=10, help="количество пользователей")
+    parser.add_argument("--tasks", type=int, default=1000, help="количество задач у каждого пользователя")
+    parser.add_argument("--workloads", default="login,read,write", help="сценарии через запятую")
+    parser.add_argument("--concurrency", type=int, default=32, help="количество параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность сценария, с")
+    parser.add_argument("--seed", type=int, default=42, help="seed генератора данных и нагрузки")
+    parser.add_argument("--output", default="", help="файл для JSON-отчета")
+    asyncio.run(main(parser.parse_args()))
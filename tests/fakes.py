@@ -0,0 +1,216 @@
+"""
+Redis в памяти для тестов: только команды, которые использует приложение
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+
+def _stream_id(event_id: str) -> Tuple[int, int]:
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class FakeRedis:
+    """
+    Асинхронный клиент Redis в памяти (строки с TTL, pipeline, блокировки, потоки).
+    after_execute вызывается после выполнения каждого pipeline, до возврата результата:
+    так тест может выполнить действие «пока ответ Redis в пути».
+    """
+    
+    def __init__(self):
+        self.values: Dict[str, bytes] = {}
+        self.expires: Dict[str, float] = {}
+        self.streams: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        self.published: List[Tuple[str, Any]] = []
+        self.after_execute: Optional[Callable[[], None]] = None
+        self.fail = False
+    
+    def _alive(self, key: str) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+    
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.values[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + ttl
+    
+    def run(self, name: str, *args: Any) -> Any:
+        if self.fail:
+            raise RedisError("Redis is unavailable")
+        name = name.upper()
+        key = args[0] if args else None
+        if name == "GET":
+            return self.values[key] if self._alive(key) else None
+        if name == "SET":
+            options = [str(arg).upper() for arg in args[2:]]
+            if "NX" in options and self._alive(key):
+                return None
+            ttl = float(args[2 + options.index("EX") + 1]) if "EX" in options else None
+            self.put(key, args[1], ttl)
+            return True
+        if name == "TTL":
+            if not self._alive(key):
+                return -2
+            if key not in self.expires:
+                return -1
+            return round(self.expires[key] - time.monotonic())
+        if name == "EXISTS":
+            return int(self._alive(key))
+        if name == "DEL":
+            return sum(self.values.pop(arg, None) is not None for arg in args)
+        if name == "INCR":
+            value = int(self.values[key]) + 1 if self._alive(key) else 1
+            self.values[key] = str(value).encode()
+            return value
+        if name == "PUBLISH":
+            self.published.append((args[0], args[1]))
+            return 0
+        raise NotImplementedError(name)
+    
+    async def execute_command(self, name: str, *args: Any) -> Any:
+        return self.run(name, *args)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.run("GET", key)
+    
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        return self.run("SET", key, value, *(("EX", ex) if ex else ()))
+    
+    async def delete(self, *keys: str) -> int:
+        return self.run("DEL", *keys)
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        return self.run("PUBLISH", channel, message)
+    
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+    
+    def lock(self, name: str, timeout: Optional[float] = None) -> "FakeLock":
+        return FakeLock(self, name, timeout)
+    
+    def register_script(self, script: str) -> Callable[..., Any]:
+        async def run(*args: Any, **kwargs: Any) -> Any:
+            raise NotImplementedError("Lua scripts")
+        return run
+    
+    def xadd(self, key: str, data: str, maxlen: Optional[int] = None) -> str:
+        entries = self.streams.setdefault(key, [])
+        ms, seq = _stream_id(entries[-1][0]) if entries else (0, 0)
+        event_id = f"{ms + 1}-{seq}"
+        entries.append((event_id, {"data": data}))
+        if maxlen is not None:
+            del entries[:-maxlen]
+        return event_id
+    
+    async def xlen(self, key: str) -> int:
+        return len(self.streams.get(key, ()))
+    
+    async def xrange(self, key: str, min: str = "-", max: str = "+", count: Optional[int] = None):
+        entries = [
+            entry for entry in self.streams.get(key, ())
+            if (min == "-" or _stream_id(entry[0]) >= _stream_id(min))
+            and (max == "+" or _stream_id(entry[0]) <= _stream_id(max))
+        ]
+        return entries[:count] if count else entries
+    
+    async def xrevrange(self, key: str, max: str = "+", min: str = "-", count: Optional[int] = None):
+        entries = (await self.xrange(key, min, max))[::-1]
+        return entries[:count] if count else entries
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands: List[Tuple[Any, ...]] = []
+    
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+    
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.commands = []
+    
+    def execute_command(self, *command: Any) -> "FakePipeline":
+        self.commands.append(command)
+        return self
+    
+    def get(self, key: str) -> "FakePipeline":
+        return self.execute_command("GET", key)
+    
+    def ttl(self, key: str) -> "FakePipeline":
+        return self.execute_command("TTL", key)
+    
+    async def execute(self) -> List[Any]:
+        results = [self.redis.run(*command) for command in self.commands]
+        self.commands = []
+        if self.redis.after_execute is not None:
+            self.redis.after_execute()
+        return results
+
+
+class FakeLock:
+    def __init__(self, redis: FakeRedis, name: str, timeout: Optional[float]):
+        self.redis = redis
+        self.name = name
+        self.timeout = timeout
+    
+    async def acquire(self, blocking: bool = True) -> bool:
+        return self.redis.run("SET", self.name, b"1", "NX", *(("EX", self.timeout) if self.timeout else ())) is True
+    
+    async def release(self) -> None:
+        self.redis.run("DEL", self.name)
+
+
+class FakeSyncRedis:
+    """
+    Синхронный клиент Redis в памяти для лимитера запросов: счетчики окон,
+    которые изменяет скрипт INCR_EXPIRE_SCRIPT (app.core.rate_limit)
+    """
+    
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.expires: Dict[str, float] = {}
+        self.executions = 0
+        self.fail = False
+    
+    def register_script(self, script: str) -> "FakeIncrExpireScript":
+        return FakeIncrExpireScript()
+    
+    def pipeline(self, transaction: bool = True) -> "FakeSyncPipeline":
+        return FakeSyncPipeline(self)
+    
+    def pttl(self, key: str) -> int:
+        expires_at = self.expires.get(key)
+        if expires_at is None or expires_at <= time.time():
+            return -2
+        return int((expires_at - time.time()) * 1000)
+    
+    def incr_expire(self, key: str, amount: int, expiry: int) -> List[int]:
+        if self.pttl(key) < 0:
+            self.counters[key] = 0
+            self.expires[key] = time.time() + expiry
+        self.counters[key] += amount
+        return [self.counters[key], self.pttl(key)]
+
+
+class FakeIncrExpireScript:
+    def __call__(self, keys: List[str], args: List[Any], client: "FakeSyncPipeline") -> None:
+        client.calls.append((keys[0], *args))
+
+
+class FakeSyncPipeline:
+    def __init__(self, redis: FakeSyncRedis):
+        self.redis = redis
+        self.calls: List[Tuple[Any, ...]] = []
+    
+    def execute(self) -> List[Any]:
+        if self.redis.fail:
+            raise RedisError("Redis is unavailable")
+        self.redis.executions += 1
+        return [self.redis.incr_expire(*call) for call in self.calls]
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from app.core import cache
+from app.core.cache import TwoTierBackend
+from tests.fakes import FakeRedis
+
+
+def make_backend(redis: FakeRedis, **options) -> TwoTierBackend:
+    return TwoTierBackend(redis, channel="invalidate", max_items=100, max_bytes=10000, local_ttl=60, **options)
+
+
+@pytest.mark.asyncio
+async def test_remote_value_is_cached_locally():
+    redis = FakeRedis()
+    redis.put("key", b"value", ttl=30)
+    backend = make_backend(redis)
+    
+    assert (await backend.get_with_ttl("key"))[1] == b"value"
+    assert backend.get_local("key")[1] == b"value"
+
+
+@pytest.mark.asyncio
+async def test_value_read_before_invalidation_is_not_cached_locally():
+    redis = FakeRedis()
+    redis.put("key", b"old", ttl=30)
+    backend = make_backend(redis)
+    # инвалидация приходит, пока ответ Redis со старым значением в пути
+    redis.after_execute = lambda: backend._clear_local(key="key")
+    
+    assert (await backend.get_with_ttl("key"))[1] == b"old"
+    assert backend.get_local("key") is None
+
+
+@pytest.mark.asyncio
+async def test_get_many_skips_local_cache_after_invalidation():
+    redis = FakeRedis()
+    redis.put("a", b"1", ttl=30)
+    redis.put("b", b"2", ttl=30)
+    backend = make_backend(redis)
+    redis.after_execute = lambda: backend._clear_local(namespace="other")
+    
+    assert [value for _, value in await backend.get_many(["a", "b"])] == [b"1", b"2"]
+    assert backend.get_local("a") is None and backend.get_local("b") is None
+
+
+def test_set_local_with_outdated_epoch_is_dropped():
+    backend = make_backend(FakeRedis())
+    epoch = backend.invalidation_epoch
+    backend._clear_local(key="generation")
+    
+    backend.set_local("generation", b"1", epoch=epoch)
+    assert backend.get_local("generation") is None
+    
+    backend.set_local("generation", b"2", epoch=backend.invalidation_epoch)
+    assert backend.get_local("generation")[1] == b"2"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_wait_for_one_computation():
+    redis = FakeRedis()
+    backend = make_backend(redis, single_flight=True)
+    computed = asyncio.Event()
+    
+    async def leader():
+        result = await backend.get_with_ttl("key")
+        await computed.wait()
+        await backend.set("key", b"value", 30)
+        return result
+    
+    leader_task = asyncio.create_task(leader())
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(backend.get_with_ttl("key")) for _ in range(3)]
+    await asyncio.sleep(0)
+    computed.set()
+    
+    assert await leader_task == (0, None)
+    assert await asyncio.gather(*followers) == [(30, b"value")] * 3
+    assert backend.stats["flight_leaders"] == 1
+    assert backend.stats["flight_coalesced"] == 3
+    # блокировка освобождается после вычисления
+    await asyncio.sleep(0)
+    assert "fastapi-cache:lock:key" not in redis.values
+
+
+@pytest.mark.asyncio
+async def test_waiters_compute_themselves_when_leader_fails():
+    backend = make_backend(FakeRedis(), single_flight=True, lock_timeout=10)
+    
+    async def failing_leader():
+        await backend.get_with_ttl("key")
+        raise RuntimeError("endpoint failed")
+    
+    leader_task = asyncio.create_task(failing_leader())
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(backend.get_with_ttl("key"))
+    with pytest.raises(RuntimeError):
+        await leader_task
+    
+    # без ожидания lock_timeout
+    assert await asyncio.wait_for(follower, 1) == (0, None)
+
+
+@pytest.mark.asyncio
+async def test_miss_waits_for_value_computed_by_another_worker(monkeypatch):
+    monkeypatch.setattr(cache, "LOCK_POLL_SECONDS", 0.01)
+    redis = FakeRedis()
+    redis.put("fastapi-cache:lock:key", b"1", ttl=5)
+    backend = make_backend(redis, single_flight=True)
+    
+    waiter = asyncio.create_task(backend.get_with_ttl("key"))
+    await asyncio.sleep(0.03)
+    assert not waiter.done()
+    redis.put("key", b"value", ttl=30)
+    redis.run("DEL", "fastapi-cache:lock:key")
+    
+    assert await waiter == (30, b"value")
+    assert backend.stats["flight_remote_waits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_one_request_revalidates():
+    redis = FakeRedis()
+    backend = make_backend(redis, single_flight=True, stale_ttl=60)
+    # TTL 30 < stale_ttl: основной TTL записи истек
+    redis.put("key", b"old", ttl=30)
+    
+    assert await backend.get_with_ttl("key") == (0, None)
+    assert await backend.get_with_ttl("key") == (0, b"old")
+    assert backend.stats["flight_stale_served"] == 1
+    
+    await backend.set("key", b"new", 10)
+    assert redis.run("TTL", "key") == 70
+    assert await backend.get_with_ttl("key") == (10, b"new")
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_another_worker_revalidates():
+    redis = FakeRedis()
+    redis.put("key", b"old", ttl=30)
+    redis.put("fastapi-cache:lock:key", b"1", ttl=5)
+    backend = make_backend(redis, single_flight=True, stale_ttl=60)
+    
+    assert await backend.get_with_ttl("key") == (0, b"old")
+    assert backend.stats["flight_stale_served"] == 1
+    assert backend._flights == {}
@@ -0,0 +1,82 @@
+import pytest
+
+from app.core import events
+from app.core.events import TaskEventHub, START_ID
+from tests.fakes import FakeRedis
+
+USER_ID = 1
+KEY = TaskEventHub.stream_key(USER_ID)
+
+
+def make_hub(redis: FakeRedis, stream_maxlen: int = 5) -> TaskEventHub:
+    return TaskEventHub(
+        redis, channel="events", stream_maxlen=stream_maxlen, stream_ttl=60, queue_size=10, max_connections=10
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_events_after_offset():
+    redis = FakeRedis()
+    ids = [redis.xadd(KEY, f"event {i}") for i in range(3)]
+    hub = make_hub(redis)
+    
+    assert await hub.replay(USER_ID, START_ID) == [(ids[0], "event 0"), (ids[1], "event 1"), (ids[2], "event 2")]
+    assert await hub.replay(USER_ID, ids[0]) == [(ids[1], "event 1"), (ids[2], "event 2")]
+    assert await hub.replay(USER_ID, ids[2]) == []
+    assert await hub.last_id(USER_ID) == ids[2]
+
+
+@pytest.mark.asyncio
+async def test_replay_from_trimmed_offset_requires_reset():
+    redis = FakeRedis()
+    ids = [redis.xadd(KEY, f"event {i}", maxlen=5) for i in range(8)]
+    hub = make_hub(redis, stream_maxlen=5)
+    
+    # событие ids[1] удалено из журнала: пропущенные события восстановить нельзя
+    assert await hub.replay(USER_ID, ids[1]) is None
+    assert await hub.replay(USER_ID, ids[3]) == [(event_id, f"event {i}") for i, event_id in enumerate(ids) if i > 3]
+
+
+@pytest.mark.asyncio
+async def test_replay_from_start_of_full_stream_requires_reset():
+    redis = FakeRedis()
+    for i in range(5):
+        redis.xadd(KEY, f"event {i}", maxlen=5)
+    
+    assert await make_hub(redis, stream_maxlen=5).replay(USER_ID, START_ID) is None
+
+
+@pytest.mark.asyncio
+async def test_replay_from_expired_stream_requires_reset():
+    redis = FakeRedis()
+    event_id = redis.xadd(KEY, "event")
+    hub = make_hub(redis)
+    del redis.streams[KEY]
+    
+    assert await hub.replay(USER_ID, event_id) is None
+    assert await hub.replay(USER_ID, START_ID) == []
+    assert await hub.last_id(USER_ID) == START_ID
+
+
+@pytest.mark.asyncio
+async def test_replay_is_limited_by_batch_size(monkeypatch):
+    monkeypatch.setattr(events, "REPLAY_BATCH_SIZE", 2)
+    redis = FakeRedis()
+    ids = [redis.xadd(KEY, f"event {i}") for i in range(4)]
+    hub = make_hub(redis, stream_maxlen=100)
+    
+    assert [event_id for event_id, _ in await hub.replay(USER_ID, START_ID)] == ids[:2]
+    assert [event_id for event_id, _ in await hub.replay(USER_ID, ids[1])] == ids[2:]
+
+
+@pytest.mark.asyncio
+async def test_events_stream_resets_when_offset_is_lost():
+    redis = FakeRedis()
+    ids = [redis.xadd(KEY, f"event {i}", maxlen=2) for i in range(4)]
+    hub = make_hub(redis, stream_maxlen=2)
+    stream = hub.events(USER_ID, ids[0], heartbeat=10)
+    
+    assert await anext(stream) == (ids[3], "reset", "{}")
+    assert hub.connections == 1
+    await stream.aclose()
+    assert hub.connections == 0
@@ -0,0 +1,79 @@
+import pytest
+
+from app.api.formats import RecordSplitter, decode_records
+
+
+async def collect(chunks, format, max_length=None):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    
+    records = []
+    async for batch in decode_records(stream(), format, max_length):
+        records.extend(batch)
+    return records
+
+
+def test_splitter_joins_lines_split_between_chunks():
+    splitter = RecordSplitter()
+    assert splitter.feed(b'{"title": "a"}\n{"tit') == [(1, '{"title": "a"}', None)]
+    assert splitter.feed(b'le": "b"}\r\n\n') == [(2, '{"title": "b"}', None)]
+    assert splitter.feed(b'{"title": "c"}', final=True) == [(4, '{"title": "c"}', None)]
+
+
+def test_splitter_keeps_multibyte_characters_split_between_chunks():
+    data = "\ufeffзадача\n".encode()
+    splitter = RecordSplitter()
+    assert splitter.feed(data[:5]) == []
+    assert splitter.feed(data[5:], final=True) == [(1, "задача", None)]
+
+
+def test_splitter_joins_quoted_csv_lines():
+    splitter = RecordSplitter(quoted=True)
+    assert splitter.feed(b'a,"first\nsecond"\nb,c\n', final=True) == [
+        (1, 'a,"first\nsecond"', None), (3, "b,c", None)
+    ]
+
+
+def test_splitter_drops_oversized_line_without_buffering_it():
+    splitter = RecordSplitter(max_length=10)
+    assert splitter.feed(b"short\n" + b"x" * 20) == [(1, "short", None)]
+    assert splitter.pending == ""
+    assert splitter.feed(b"x" * 20) == []
+    assert splitter.pending == ""
+    assert splitter.feed(b"x\nnext\n") == [(2, None, "Record is longer than 10 characters"), (3, "next", None)]
+
+
+def test_splitter_drops_oversized_quoted_record():
+    splitter = RecordSplitter(quoted=True, max_length=10)
+    records = splitter.feed(b'a,"' + b"x" * 8 + b'\n' + b'y' * 8 + b'\n"\nb,c\n', final=True)
+    assert records == [(1, None, "Record is longer than 10 characters"), (4, "b,c", None)]
+
+
+@pytest.mark.asyncio
+async def test_decode_ndjson_parses_each_line_separately():
+    records = await collect([b'{"title": "a"}\n[{"title": "b"},\n{"title": "c"}]\n{"title": "d"}{"title": "e"}\n'], "ndjson")
+    assert records[0] == (1, {"title": "a"}, None)
+    # строки, которые вместе образовали бы корректный JSON, отклоняются по отдельности
+    assert [(line, data) for line, data, _ in records[1:]] == [(2, None), (3, None), (4, None)]
+    assert all(error.startswith("Invalid JSON") for _, _, error in records[1:])
+
+
+@pytest.mark.asyncio
+async def test_decode_csv_uses_header():
+    records = await collect([b"title,description\na,", b"b\nc,\nd\n"], "csv")
+    assert records == [
+        (2, {"title": "a", "description": "b"}, None),
+        (3, {"title": "c", "description": None}, None),
+        (4, None, "Expected 2 columns, got 1"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_decode_reports_oversized_records():
+    records = await collect([b'{"title": "a"}\n{"title": "', b"x" * 100, b'"}\n{"title": "b"}'], "ndjson", 50)
+    assert records == [
+        (1, {"title": "a"}, None),
+        (2, None, "Record is longer than 50 characters"),
+        (3, {"title": "b"}, None),
+    ]
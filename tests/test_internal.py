@@ -0,0 +1,30 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routers import metrics
+from app.config import settings
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_metrics_are_forbidden_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", None)
+    
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"X-Internal-Token": ""}).status_code == 403
+
+
+def test_metrics_require_internal_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "secret")
+    
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"X-Internal-Token": "wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,20 @@
+import pytest
+
+from app.core.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([42, "Задача \"1\"", None])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == [42, "Задача \"1\"", None]
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(["???>>>~~~"])
+    assert all(char.isalnum() or char in "-_" for char in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", encode_cursor({"id": 1}), encode_cursor([1, 2])])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, 1)
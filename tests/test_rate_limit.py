@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import HybridRedisStorage
+from tests.fakes import FakeSyncRedis
+
+
+@pytest.fixture
+def redis():
+    return FakeSyncRedis()
+
+
+@pytest.fixture
+def make_storage(redis, monkeypatch):
+    monkeypatch.setattr(rate_limit.redis.Redis, "from_url", lambda *args, **kwargs: redis)
+    storages = []
+    
+    def make(**options) -> HybridRedisStorage:
+        # фоновая синхронизация не успевает сработать за время теста
+        storage = HybridRedisStorage("hybrid+redis://localhost:6379", sync_interval=3600, **options)
+        storages.append(storage)
+        return storage
+    
+    yield make
+    for storage in storages:
+        storage.stop()
+
+
+def test_hits_are_synced_on_first_hit_and_every_max_pending(make_storage, redis):
+    storage = make_storage(max_pending=3)
+    
+    assert storage.incr("user:1", 60) == 1
+    assert redis.executions == 1
+    assert [storage.incr("user:1", 60) for _ in range(2)] == [2, 3]
+    assert redis.executions == 1
+    assert storage.incr("user:1", 60) == 4
+    assert redis.executions == 2
+    assert redis.counters["LIMITS:user:1"] == 4
+    assert storage.stats["inline_syncs"] == 2
+
+
+def test_batch_sync_sends_pending_hits_and_reads_global_counters(make_storage, redis):
+    first, second = make_storage(max_pending=100), make_storage(max_pending=100)
+    for _ in range(5):
+        first.incr("user:1", 60)
+    for _ in range(3):
+        second.incr("user:1", 60)
+    assert redis.counters["LIMITS:user:1"] == 2
+    
+    first.sync()
+    second.sync()
+    assert redis.counters["LIMITS:user:1"] == 8
+    # синхронизация возвращает глобальное значение с попаданиями другого воркера
+    assert first.get("user:1") == 6
+    assert second.get("user:1") == 8
+    
+    first.incr("user:1", 60)
+    first.sync()
+    assert first.get("user:1") == 9
+    assert first.stats["synced_keys"] == 3
+
+
+def test_hits_stay_local_while_redis_is_unavailable(make_storage, redis):
+    storage = make_storage(max_pending=2)
+    redis.fail = True
+    
+    assert [storage.incr("user:1", 60) for _ in range(4)] == [1, 2, 3, 4]
+    assert storage.stats["sync_errors"] == 1
+    assert redis.counters == {}
+    
+    redis.fail = False
+    storage.sync()
+    assert redis.counters["LIMITS:user:1"] == 4
+    assert storage.get("user:1") == 4
+
+
+def test_expired_window_starts_new_counter(make_storage, redis, monkeypatch):
+    storage = make_storage(max_pending=100)
+    storage.incr("user:1", 1)
+    storage.incr("user:1", 1)
+    assert storage.get("user:1") == 2
+    
+    now = time.time() + 2
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now)
+    assert storage.get("user:1") == 0
+    assert storage.incr("user:1", 1) == 1
+    assert redis.counters["LIMITS:user:1"] == 1
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.db import database
+from app.db.replicas import ReplicaPool
+
+
+class FakeSession:
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.info = {}
+        self.closed = False
+    
+    async def __aenter__(self) -> "FakeSession":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    async def connection(self) -> None:
+        if self.error is not None:
+            raise self.error
+    
+    async def rollback(self) -> None:
+        pass
+    
+    async def close(self) -> None:
+        self.closed = True
+
+
+class HangingConnect:
+    async def __aenter__(self):
+        await asyncio.sleep(3600)
+    
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+def make_replica(session_factory=None, connect=None) -> SimpleNamespace:
+    engine = SimpleNamespace(url="postgresql+asyncpg://replica", connect=connect)
+    return SimpleNamespace(engine=engine, session_factory=session_factory, healthy=True)
+
+
+def make_request() -> SimpleNamespace:
+    return SimpleNamespace(cookies={}, state=SimpleNamespace(), method="GET", url=SimpleNamespace(path="/tasks"))
+
+
+@pytest.mark.asyncio
+async def test_check_times_out_hanging_connect():
+    pool = ReplicaPool([], balancing="round_robin", health_check_interval=0.01)
+    replica = make_replica(connect=HangingConnect)
+    
+    await asyncio.wait_for(pool.check(replica), 1)
+    assert replica.healthy is False
+
+
+@pytest.mark.asyncio
+async def test_read_falls_back_to_primary_when_replica_is_down(monkeypatch):
+    replica_session = FakeSession(ConnectionRefusedError("replica is down"))
+    primary_session = FakeSession()
+    replica = make_replica(session_factory=lambda: replica_session)
+    pool = ReplicaPool([], balancing="round_robin", health_check_interval=5)
+    pool.replicas = [replica]
+    monkeypatch.setattr(database, "replicas", pool)
+    monkeypatch.setattr(database, "ReadOnlySessionLocal", lambda: primary_session)
+    
+    sessions = database.get_read_db(make_request())
+    assert await sessions.__anext__() is primary_session
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+    
+    assert replica.healthy is False
+    assert replica_session.closed and primary_session.closed
+    assert pool.choose() is None
+
+
+@pytest.mark.asyncio
+async def test_read_uses_reachable_replica(monkeypatch):
+    replica_session = FakeSession()
+    replica = make_replica(session_factory=lambda: replica_session)
+    pool = ReplicaPool([], balancing="round_robin", health_check_interval=5)
+    pool.replicas = [replica]
+    monkeypatch.setattr(database, "replicas", pool)
+    
+    sessions = database.get_read_db(make_request())
+    assert await sessions.__anext__() is replica_session
+    await sessions.aclose()
+    
+    assert replica.healthy is True
+    assert replica_session.closed
@@ -0,0 +1,30 @@
+import pytest
+
+from app.repo.TaskRepository import prefix_upper_bound
+
+
+@pytest.mark.parametrize("prefix, upper", [
+    ("abc", "abd"),
+    ("a", "b"),
+    ("Zz", "Z{"),
+    ("зад", "зае"),
+    ("a\U0010FFFF", "b"),
+    ("a\U0010FFFF\U0010FFFF", "b"),
+    ("a\ud7ff", "a\ue000"),
+])
+def test_prefix_upper_bound(prefix, upper):
+    assert prefix_upper_bound(prefix) == upper
+
+
+@pytest.mark.parametrize("prefix", ["", "\U0010FFFF", "\U0010FFFF\U0010FFFF"])
+def test_prefix_upper_bound_missing(prefix):
+    assert prefix_upper_bound(prefix) is None
+
+
+@pytest.mark.parametrize("prefix", ["abc", "за", "a\ud7ff", "x\U0010FFFF"])
+def test_prefix_range_matches_bytewise_order(prefix):
+    upper = prefix_upper_bound(prefix)
+    # строки с префиксом лежат в диапазоне [prefix, upper) при побайтном (COLLATE "C") сравнении
+    for value in (prefix, prefix + "a", prefix + "\U0010FFFF" * 3):
+        assert prefix.encode() <= value.encode() < upper.encode()
+    assert upper.encode() > (prefix + "\U0010FFFF").encode()
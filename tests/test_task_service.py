@@ -0,0 +1,34 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas import TaskUpdate, TaskBulkUpdate
+from app.services.TaskService import TaskService
+
+
+def test_task_event_is_built_from_column_values():
+    # is_completed может быть NULL (например, после PUT с null) - событие все равно сериализуется
+    task = SimpleNamespace(id=7, title="Task", description=None, is_completed=None, owner_id=1, version=3)
+    
+    event = TaskService._task_event("updated", task)
+    
+    assert event == {
+        "type": "updated",
+        "task_id": 7,
+        "task": {"id": 7, "title": "Task", "description": None, "is_completed": None, "owner_id": 1},
+    }
+    assert json.loads(json.dumps(event)) == event
+
+
+@pytest.mark.parametrize("schema, data", [
+    (TaskUpdate, {"title": "Task", "description": None, "is_completed": None}),
+    (TaskBulkUpdate, {"id": 1, "title": "Task", "description": None, "is_completed": None}),
+])
+def test_task_update_accepts_null_is_completed(schema, data):
+    assert schema.model_validate(data).is_completed is None
+
+
+def test_task_update_keeps_is_completed_unset():
+    task_data = TaskUpdate.model_validate({"title": "Task", "description": None})
+    assert "is_completed" not in task_data.model_dump(exclude_unset=True)